@@ -0,0 +1,46 @@
+"""Replay the successful plans of api_test_agent as a throughput benchmark, without calling any LLM.
+
+python -m agent.api_load_test api_test_plans.json --server https://stg.example.com --duration 60 --max-p95-ms 300
+"""
+
+import argparse
+import sys
+
+from agent.shared.load_test import load_replay_plans, run_load_test, format_load_test_report
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("plans", help="Plans file written by api_test_agent")
+parser.add_argument("--server", required=True)
+parser.add_argument("--token", default=None)
+parser.add_argument("--methods", nargs="+", default=["GET"], help="Only replay these methods (default: GET)")
+parser.add_argument("--concurrency", type=int, default=8)
+parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before the measurement")
+parser.add_argument("--max-p95-ms", type=float, default=None, help="Fail when any endpoint p95 exceeds this")
+parser.add_argument("--max-error-rate", type=float, default=None, help="Fail when any endpoint error rate exceeds this")
+args = parser.parse_args()
+
+plans = load_replay_plans(args.plans, args.methods)
+if not plans:
+    print("No plans to replay")
+    exit()
+
+report = run_load_test(
+    server=args.server,
+    plans=plans,
+    token=args.token,
+    concurrency=args.concurrency,
+    duration=args.duration,
+    warmup=args.warmup,
+)
+print(format_load_test_report(report))
+
+failures = [
+    row["endpoint"]
+    for row in report
+    if (args.max_p95_ms is not None and row["p95_ms"] > args.max_p95_ms)
+    or (args.max_error_rate is not None and row["error_rate"] > args.max_error_rate)
+]
+if failures:
+    print("Performance regression:", ", ".join(failures))
+    sys.exit(1)
@@ -1,70 +1,203 @@
-from typing import Literal
+from typing import Literal, Optional
 
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama
+from langchain_core.runnables import Runnable
 from langgraph.constants import START, END
 from langgraph.graph import StateGraph
-from langgraph.types import Command
+from langgraph.types import Command, Send
 
-from agent.shared.prompts import API_TEST_PLAN_INSTRUCTIONS
+from agent.shared.contracts import get_response_validator
+from agent.shared.id_index import extract_ids, select_candidate_ids, format_candidate_ids
+from agent.shared.instrumentation import get_recorder
+from agent.shared.llm import get_chat_ollama, get_structured_chat_ollama, set_model_scheduler, warm_up
+from agent.shared.llm_cache import LLMResponseCache
+from agent.shared.model_scheduler import ModelScheduler
+from agent.shared.load_test import save_replay_plans
+from agent.shared.plan_cache import PlanCache
+from agent.shared.prompts import (
+    API_TEST_PLAN_INSTRUCTIONS,
+    API_TEST_RESULT_CHUNK_INSTRUCTIONS,
+    API_TEST_REPORT_INSTRUCTIONS,
+)
+from agent.shared.reporting import (
+    summarize_request_results,
+    format_request_statistics,
+    format_request_result,
+    chunk_by_tokens,
+)
 from agent.shared.response_formats import APIPlanResponse
-from agent.shared.states import APITestState
+from agent.shared.scheduler import schedule_endpoint_levels
+from agent.shared.spec_render import render_endpoint
+from agent.shared.states import APITestState, APIEndpointState
+from agent.shared.streaming import stream_graph, print_stream_event
+from agent.shared.tokens import estimate_tokens
 from agent.shared.utils import draw_graph_png, request_api_by_plan, reduce_openapi_spec, escape_with_double_curly_braces
 
 
 class Node:
     REQUEST_NODE = "request_node"
     PLAN_NODE = "plan_node"
+    ENDPOINT_NODE = "endpoint_node"
+    LEVEL_NODE = "level_node"
     FINALIZE_NODE = "finalize_node"
 
 
-def plan_node(state: APITestState):
-    endpoint = escape_with_double_curly_braces(state.open_api_spec.endpoints[state.endpoint_index])
-    success_results = [res for res in state.request_results if res["is_success"]]
+PLAN_MODEL = "qwen2.5:14b-instruct-q8_0"
+FINALIZE_MODEL = "exaone3.5:7.8b-instruct-fp16"
+
+# Nesting depth of request/response schemas rendered into the planner prompt
+PLAN_SCHEMA_MAX_DEPTH = 4
+
+# Token budget of one result batch and parallel batch summaries in finalize_node
+FINALIZE_CHUNK_TOKENS = 3000
+FINALIZE_MAX_CONCURRENCY = 4
+# Token budget of the statistics and batch summaries in the report prompt
+FINALIZE_REPORT_TOKENS = 6000
+
+# Replays the plans of unchanged endpoints from previous runs, set to None to always ask the planner LLM
+plan_cache = PlanCache()
+
+# Serves repeated planner and report prompts from disk, set to None to always call the model
+llm_cache = LLMResponseCache("api_test_agent")
+
+# Runs the planner and report calls of concurrent runs grouped by model so Ollama swaps less. Only pays off when several
+# runs with different call patterns share one Ollama server (see benchmarks/model_swaps.py), set to ModelScheduler()
+# then
+model_scheduler: Optional[ModelScheduler] = None
+set_model_scheduler(model_scheduler)
+
+
+def plan_api_request(endpoint: tuple, candidate_ids: dict) -> APIPlanResponse:
+    if plan_cache:
+        cached_plan = plan_cache.get(endpoint, candidate_ids)
+        if cached_plan:
+            return cached_plan
+
+    endpoint = escape_with_double_curly_braces(render_endpoint(endpoint, PLAN_SCHEMA_MAX_DEPTH))
 
     system_message = API_TEST_PLAN_INSTRUCTIONS + f"\n\n<API_SPECIFICATION>\n{endpoint}\n</API_SPECIFICATION>"
-    if success_results:
-        result_text = escape_with_double_curly_braces(success_results)
-        system_message += f"\n\n<Previous Success Results>\n{result_text}\n</Previous Success Results>"
+    if candidate_ids:
+        candidate_text = escape_with_double_curly_braces(format_candidate_ids(candidate_ids))
+        system_message += f"\n\n<Candidate IDs>\n{candidate_text}\n</Candidate IDs>"
 
-    llm = ChatOllama(model="qwen2.5:14b-instruct-q8_0", temperature=0.1).with_structured_output(APIPlanResponse)
+    llm = get_structured_chat_ollama(APIPlanResponse, PLAN_MODEL, temperature=0.1, cache=llm_cache)
     prompt = ChatPromptTemplate.from_messages(
         [
             {"role": "system", "content": system_message},
         ]
     )
     chain = prompt | llm
-    chat_response = chain.invoke({"input": "Plan an API request"})
+    return chain.invoke({"input": "Plan an API request"})
+
+
+def endpoint_order(state: APITestState) -> list[int]:
+    if state.endpoint_levels:
+        return [index for level in state.endpoint_levels for index in level]
+    return list(range(state.endpoint_size))
+
+
+def cache_plan_result(endpoint: tuple, candidate_ids: dict, plan: APIPlanResponse, result: dict):
+    if not plan_cache:
+        return
+    if result["is_success"]:
+        plan_cache.put(endpoint, candidate_ids, plan)
+    else:
+        plan_cache.invalidate(endpoint)
+
+
+def index_result_ids(endpoint: tuple, result: dict) -> dict:
+    if not result["is_success"]:
+        return {}
+    return extract_ids(endpoint[0], result.get("body"))
+
+
+def plan_node(state: APITestState):
+    endpoint = state.open_api_spec.endpoints[endpoint_order(state)[state.endpoint_index]]
+    chat_response = plan_api_request(endpoint, select_candidate_ids(state.id_index, endpoint))
     return Command(
         goto=Node.REQUEST_NODE,
         update={
-            "request_plans": state.request_plans + [chat_response],
+            "request_plans": [chat_response],
         },
     )
 
 
 def request_node(state: APITestState):
     server = state.open_api_spec.servers[0]["url"]
-    result = request_api_by_plan(server, state.request_plans[-1], state.token)
+    endpoint = state.open_api_spec.endpoints[endpoint_order(state)[state.endpoint_index]]
+    plan = state.request_plans[-1]
+    result = request_api_by_plan(server, plan, state.token, validator=get_response_validator(endpoint))
+    result["operation"] = endpoint[0]
+    cache_plan_result(endpoint, select_candidate_ids(state.id_index, endpoint), plan, result)
     return {
         "endpoint_index": state.endpoint_index + 1,
-        "request_results": state.request_results + [result],
+        "request_results": [result],
+        "id_index": index_result_ids(endpoint, result),
     }
 
 
+def endpoint_node(state: APIEndpointState):
+    plan = plan_api_request(state.endpoint, state.candidate_ids)
+    result = request_api_by_plan(state.server, plan, state.token, validator=get_response_validator(state.endpoint))
+    result["operation"] = state.endpoint[0]
+    cache_plan_result(state.endpoint, state.candidate_ids, plan, result)
+    return {
+        "request_plans": [plan],
+        "request_results": [result],
+        "id_index": index_result_ids(state.endpoint, result),
+    }
+
+
+def summarize_chunks(chain: Runnable, texts: list[str]) -> list[str]:
+    """Summarize texts in parallel batches of at most FINALIZE_CHUNK_TOKENS, one summary per batch."""
+    chunks = chunk_by_tokens(texts, FINALIZE_CHUNK_TOKENS)
+    return chain.batch(
+        [{"results": "\n".join(chunk)} for chunk in chunks],
+        config={"max_concurrency": FINALIZE_MAX_CONCURRENCY},
+    )
+
+
 def finalize_node(state: APITestState):
-    llm = ChatOllama(model="exaone3.5:7.8b-instruct-fp16", temperature=0.1)
+    statistics = format_request_statistics(summarize_request_results(state.request_results))
+    summaries = [format_request_result(result) for result in state.request_results]
+
+    llm = get_chat_ollama(FINALIZE_MODEL, temperature=0.1, cache=llm_cache)
+    if len(chunk_by_tokens(summaries, FINALIZE_CHUNK_TOKENS)) > 1:
+        # Map: summarize result batches in parallel, so no single prompt has to hold every response body.
+        chunk_prompt = ChatPromptTemplate.from_messages(
+            [
+                {"role": "system", "content": API_TEST_RESULT_CHUNK_INSTRUCTIONS},
+                {"role": "user", "content": "Summarize these API test results:\n{results}"},
+            ]
+        )
+        # Only the report streams to the user, batch summaries are tagged `nostream`
+        chunk_chain = (chunk_prompt | llm | StrOutputParser()).with_config(tags=["nostream"])
+        summaries = summarize_chunks(chunk_chain, summaries)
+        # Many batches can still overflow the report prompt together, their summaries are batched and summarized
+        # again until they fit. A round that doesn't shrink them ends it, it would only repeat.
+        max_summaries_tokens = FINALIZE_REPORT_TOKENS - estimate_tokens(statistics)
+        summaries_tokens = sum(estimate_tokens(summary) for summary in summaries)
+        while len(summaries) > 1 and summaries_tokens > max_summaries_tokens:
+            reduced = summarize_chunks(chunk_chain, summaries)
+            reduced_tokens = sum(estimate_tokens(summary) for summary in reduced)
+            if reduced_tokens >= summaries_tokens:
+                break
+            summaries, summaries_tokens = reduced, reduced_tokens
+
+    # Reduce: one report from the statistics and the batch summaries.
     prompt = ChatPromptTemplate.from_messages(
         [
+            {"role": "system", "content": API_TEST_REPORT_INSTRUCTIONS},
             {
-                "role": "system",
-                "content": "You are a summarizer. Your task is to summarize the results of an API request.",
+                "role": "user",
+                "content": "<Statistics>\n{statistics}\n</Statistics>\n\n<Results>\n{results}\n</Results>\n\n"
+                "Write the report in KOREAN.",
             },
-            {"role": "user", "content": "Summarize the results in KOREAN: {results}"},
         ]
     )
     chain = prompt | llm
-    chat_response = chain.invoke({"results": state.request_results})
+    chat_response = chain.invoke({"statistics": statistics, "results": "\n\n".join(summaries)})
     return Command(
         goto=END,
         update={
@@ -73,6 +206,37 @@ def finalize_node(state: APITestState):
     )
 
 
+def level_node(state: APITestState):
+    return {
+        "level_index": state.level_index + 1,
+    }
+
+
+def dispatch_endpoints(state: APITestState):
+    if not state.fan_out:
+        return Node.PLAN_NODE
+
+    levels = state.endpoint_levels or ([list(range(state.endpoint_size))] if state.endpoint_size else [])
+    if state.level_index >= len(levels):
+        return Node.FINALIZE_NODE
+
+    # Endpoints of one level don't depend on each other, so they are planned and requested in parallel branches
+    # and joined at level_node. Later levels see the IDs indexed from the earlier ones.
+    server = state.open_api_spec.servers[0]["url"]
+    return [
+        Send(
+            Node.ENDPOINT_NODE,
+            APIEndpointState(
+                token=state.token,
+                server=server,
+                endpoint=state.open_api_spec.endpoints[index],
+                candidate_ids=select_candidate_ids(state.id_index, state.open_api_spec.endpoints[index]),
+            ),
+        )
+        for index in levels[state.level_index]
+    ]
+
+
 def router(state: APITestState) -> Literal["plan_node", "finalize_node"]:
     if state.endpoint_index < state.endpoint_size:
         return "plan_node"
@@ -83,11 +247,16 @@ def router(state: APITestState) -> Literal["plan_node", "finalize_node"]:
 graph_builder = StateGraph(APITestState)
 graph_builder.add_node(Node.PLAN_NODE, plan_node)
 graph_builder.add_node(Node.REQUEST_NODE, request_node)
+graph_builder.add_node(Node.ENDPOINT_NODE, endpoint_node)
+graph_builder.add_node(Node.LEVEL_NODE, level_node)
 graph_builder.add_node(Node.FINALIZE_NODE, finalize_node)
 
-graph_builder.add_edge(START, Node.PLAN_NODE)
+# A spec without endpoints has no levels, dispatch_endpoints then goes straight to finalize_node
+graph_builder.add_conditional_edges(START, dispatch_endpoints, [Node.PLAN_NODE, Node.ENDPOINT_NODE, Node.FINALIZE_NODE])
 graph_builder.add_edge(Node.PLAN_NODE, Node.REQUEST_NODE)
 graph_builder.add_conditional_edges(Node.REQUEST_NODE, router)
+graph_builder.add_edge(Node.ENDPOINT_NODE, Node.LEVEL_NODE)
+graph_builder.add_conditional_edges(Node.LEVEL_NODE, dispatch_endpoints, [Node.ENDPOINT_NODE, Node.FINALIZE_NODE])
 graph_builder.add_edge(Node.FINALIZE_NODE, END)
 graph = graph_builder.compile()
 draw_graph_png("api_test_agent.png", graph)
@@ -95,6 +264,9 @@ draw_graph_png("api_test_agent.png", graph)
 tag_input = "banner"
 server_env_input = "stg"
 access_token_input = None
+replay_plans_filepath_input = "api_test_plans.json"  # Successful plans for `python -m agent.api_load_test`
+fan_out_input = True
+max_concurrency_input = 8
 
 open_api_spec = reduce_openapi_spec(
     filepath="dataset/donotcommit.yaml",
@@ -106,16 +278,37 @@ if not open_api_spec.endpoints:
     print("No endpoints found")
     exit()
 
-stream = graph.stream(
+# Load the planner while the graph starts instead of on the first plan_node call
+warm_up(PLAN_MODEL)
+
+recorder = get_recorder()
+recorder.enabled = True
+events = stream_graph(
+    graph,
     {
         "token": access_token_input,
         "open_api_spec": open_api_spec,
         "endpoint_size": len(open_api_spec.endpoints),
         "endpoint_index": 0,
-        "request_plans": [],
-        "request_results": [],
-    }
+        "endpoint_levels": schedule_endpoint_levels(open_api_spec.endpoints),
+        "level_index": 0,
+        "fan_out": fan_out_input,
+    },
+    config={"max_concurrency": max_concurrency_input},
+    token_nodes=[Node.FINALIZE_NODE],
+    recorder=recorder,
 )
-for s in stream:
-    for agent, res in s.items():
-        print(agent, res, flush=True)
+request_plans, request_results = [], []
+for event in events:
+    print_stream_event(event)
+    if event.type == "update":
+        request_plans += (event.data or {}).get("request_plans", [])
+        request_results += (event.data or {}).get("request_results", [])
+
+save_replay_plans(replay_plans_filepath_input, request_plans, request_results, open_api_spec)
+if llm_cache:
+    print("llm cache", llm_cache.stats())
+if model_scheduler:
+    print("model scheduler", model_scheduler.metrics())
+print(recorder.format_summary())
+recorder.export("api_test_agent")
@@ -0,0 +1,132 @@
+"""Retries, timeouts, validation and connection reuse of `APIRequestExecutor` against a local `http.server` stub.
+
+Every check prints its outcome and the run exits non-zero when one of them fails. The last line compares sequential
+`request` calls with concurrent `arequest` calls, which offload the pooled session to worker threads.
+
+python -m agent.benchmarks.api_client --requests 32 --delay-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agent.shared.api_client import APIRequestExecutor
+from agent.shared.response_formats import APIPlanResponse
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so the executor's pool can reuse connections
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            attempt = server.attempts.setdefault(self.path, 0) + 1
+            server.attempts[self.path] = attempt
+
+        if self.path == "/flaky" and attempt <= 2:
+            return self.respond(503, {"error": "unavailable"})
+        if self.path == "/slow":
+            time.sleep(1)
+        if self.path == "/delayed":
+            time.sleep(server.delay_ms / 1000)
+        self.respond(200, {"id": 1, "name": "pet"} if self.path != "/invalid" else {"id": "one"})
+
+    def respond(self, status: int, body: dict):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        try:
+            self.wfile.write(content)
+        except BrokenPipeError:
+            pass  # The executor gave up on the request, as the timeout checks expect
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(delay_ms: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.connections = set()
+    server.attempts = {}
+    server.delay_ms = delay_ms
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def plan(endpoint: str) -> APIPlanResponse:
+    return APIPlanResponse(method="GET", endpoint=endpoint)
+
+
+def validate_id(body, status_code: int) -> list[str]:
+    return [] if isinstance(body.get("id"), int) else ["id: expected integer"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--delay-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    server = start_server(args.delay_ms)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    executor = APIRequestExecutor(pool_size=8, timeout=0.5, total_timeout=1.5, backoff_factor=0.05)
+    failures = 0
+
+    def check(name: str, passed: bool, detail):
+        nonlocal failures
+        failures += not passed
+        print(f"{'ok  ' if passed else 'FAIL'} {name:<20} {detail}")
+
+    for _ in range(5):
+        executor.request(url, plan("/pets"), None)
+    check("keep-alive", len(server.connections) == 1, f"{len(server.connections)} connection(s) for 5 requests")
+
+    result = executor.request(url, plan("/flaky"), None)
+    check("retry on 503", result["is_success"] and result["attempts"] == 3, f"attempts={result['attempts']}")
+
+    started_at = time.monotonic()
+    result = executor.request(url, plan("/slow"), None)
+    elapsed = time.monotonic() - started_at
+    check("total timeout", not result["is_success"] and elapsed < 2, f"{elapsed:.2f}s, {result.get('error')}")
+
+    result = executor.request(f"http://127.0.0.1:{unused_port()}", plan("/pets"), None)
+    check("connection refused", result["status_code"] is None and not result["is_success"], result.get("error")[:60])
+
+    result = executor.request(url, plan("/invalid"), None, validate_id)
+    check("validator", not result["is_success"], result["validation_errors"])
+
+    started_at = time.perf_counter()
+    for _ in range(args.requests):
+        executor.request(url, plan("/delayed"), None)
+    sequential = time.perf_counter() - started_at
+
+    async def concurrent():
+        await asyncio.gather(*(executor.arequest(url, plan("/delayed"), None) for _ in range(args.requests)))
+
+    started_at = time.perf_counter()
+    asyncio.run(concurrent())
+    concurrent_ms = (time.perf_counter() - started_at) * 1000
+    print(f"{args.requests} requests: sequential {sequential * 1000:.0f}ms, arequest {concurrent_ms:.0f}ms")
+
+    executor.close()
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Per-step cost of APITestState reducer channels vs. the former whole-list copies.
+
+Runs the plan -> request loop of api_test_agent over a synthetic spec with stubbed LLM/HTTP calls.
+
+    python -m agent.benchmarks.api_test_state --endpoints 1000 [--checkpoint]
+"""
+
+import argparse
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+from langchain_community.agent_toolkits.openapi.spec import ReducedOpenAPISpec
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.constants import START, END
+from langgraph.graph import StateGraph
+
+from agent.shared.response_formats import APIPlanResponse
+from agent.shared.states import APITestState
+
+
+@dataclass(kw_only=True)
+class LegacyAPITestState:
+    open_api_spec: ReducedOpenAPISpec = field(default=None)
+    endpoint_size: int = field(default=0)
+    endpoint_index: int = field(default=0)
+    request_plans: List[APIPlanResponse] = field(default=None)
+    request_results: List[dict] = field(default=None)
+
+
+def synthetic_spec(endpoint_size: int) -> ReducedOpenAPISpec:
+    endpoints = [
+        (
+            f"GET /resources/{index}",
+            "",
+            {"responses": {"content": {"application/json": {"schema": {"type": "object"}}}}},
+        )
+        for index in range(endpoint_size)
+    ]
+    return ReducedOpenAPISpec(servers=[{"url": "http://localhost"}], description="", endpoints=endpoints)
+
+
+def build_graph(state_schema, append_only: bool, checkpoint: bool):
+    def plan_node(state):
+        plan = APIPlanResponse(method="GET", endpoint=state.open_api_spec.endpoints[state.endpoint_index][0][4:])
+        return {"request_plans": [plan] if append_only else state.request_plans + [plan]}
+
+    def request_node(state):
+        result = {
+            "endpoint": state.request_plans[-1].endpoint,
+            "is_success": True,
+            "status_code": 200,
+            "body": {"id": state.endpoint_index, "items": [{"id": item, "name": "x" * 32} for item in range(10)]},
+        }
+        return {
+            "endpoint_index": state.endpoint_index + 1,
+            "request_results": [result] if append_only else state.request_results + [result],
+        }
+
+    def router(state):
+        return "plan_node" if state.endpoint_index < state.endpoint_size else END
+
+    graph_builder = StateGraph(state_schema)
+    graph_builder.add_node("plan_node", plan_node)
+    graph_builder.add_node("request_node", request_node)
+    graph_builder.add_edge(START, "plan_node")
+    graph_builder.add_edge("plan_node", "request_node")
+    graph_builder.add_conditional_edges("request_node", router)
+    return graph_builder.compile(checkpointer=InMemorySaver() if checkpoint else None)
+
+
+def measure(graph, spec: ReducedOpenAPISpec) -> list[float]:
+    """Return the wall time in ms of every plan+request step."""
+    timestamps = [time.perf_counter()]
+    stream = graph.stream(
+        {
+            "open_api_spec": spec,
+            "endpoint_size": len(spec.endpoints),
+            "endpoint_index": 0,
+            "request_plans": [],
+            "request_results": [],
+        },
+        config={"recursion_limit": len(spec.endpoints) * 2 + 10, "configurable": {"thread_id": "benchmark"}},
+    )
+    for s in stream:
+        if "request_node" in s:
+            timestamps.append(time.perf_counter())
+    return [(end - start) * 1000 for start, end in zip(timestamps, timestamps[1:])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", type=int, default=1000)
+    parser.add_argument("--checkpoint", action="store_true", help="Compile the graphs with an InMemorySaver")
+    args = parser.parse_args()
+
+    spec = synthetic_spec(args.endpoints)
+    decile = max(args.endpoints // 10, 1)
+    print(f"{'state':<22}{'first 10% ms/step':>20}{'last 10% ms/step':>20}{'total s':>10}")
+    for name, state_schema, append_only in (
+        ("LegacyAPITestState", LegacyAPITestState, False),
+        ("APITestState", APITestState, True),
+    ):
+        steps = measure(build_graph(state_schema, append_only, args.checkpoint), spec)
+        first = sum(steps[:decile]) / decile
+        last = sum(steps[-decile:]) / decile
+        print(f"{name:<22}{first:>20.3f}{last:>20.3f}{sum(steps) / 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
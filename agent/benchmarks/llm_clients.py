@@ -0,0 +1,90 @@
+"""Per-call overhead of constructing `ChatOllama` in every node vs. the shared registry in `agent.shared.llm`.
+
+Runs against a stand-in for Ollama's /api/chat that answers immediately, so the numbers are client setup and
+connection cost only. Pass --base-url to measure against a real server instead.
+
+python -m agent.benchmarks.llm_clients --calls 200
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_ollama import ChatOllama
+
+from agent.shared.llm import get_chat_ollama, clear_llm_clients
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        StubOllamaHandler.connections.add(self.client_address)
+        body = json.dumps(
+            {
+                "model": "stub",
+                "created_at": "2025-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": "ok"},
+                "done": True,
+                "done_reason": "stop",
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def measure(create_llm, calls: int, model: str) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        started_at = time.perf_counter()
+        create_llm().invoke("ping", model=model)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--model", default="qwen2.5:14b-instruct-q8_0")
+    parser.add_argument("--base-url", default=None)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    clear_llm_clients()
+    cases = {
+        "ChatOllama per call": lambda: ChatOllama(model=args.model, base_url=base_url, temperature=0.1),
+        "get_chat_ollama": lambda: get_chat_ollama(args.model, temperature=0.1, base_url=base_url),
+    }
+    print(f"{'':<24}{'mean':>10}{'p50':>10}{'max':>10}{'connections':>13}")
+    for name, create_llm in cases.items():
+        StubOllamaHandler.connections.clear()
+        timings = measure(create_llm, args.calls, args.model)
+        connections = len(StubOllamaHandler.connections) if server else "-"
+        print(
+            f"{name:<24}{statistics.mean(timings):>8.2f}ms{statistics.median(timings):>8.2f}ms"
+            f"{max(timings):>8.2f}ms{connections:>13}"
+        )
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
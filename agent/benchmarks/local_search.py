@@ -0,0 +1,66 @@
+"""Index build, re-index and query latency of `LocalSearchIndex` on a generated Markdown corpus.
+
+python -m agent.benchmarks.local_search --documents 2000 --words 400 --queries 200 --changed 20
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from agent.shared.instrumentation import percentile
+from agent.shared.local_search import LocalSearchIndex
+
+VOCABULARY = [
+    *(f"term{i}" for i in range(5000)),
+    *("쿠버네티스 컨테이너 배포 클러스터 노드 파드 서비스 네트워크 스토리지 모니터링 로그 보안 인증 권한".split()),
+]
+
+
+def write_document(directory: str, index: int, words: int, rng: random.Random):
+    with open(os.path.join(directory, f"doc{index}.md"), "w") as f:
+        f.write(f"# Document {index}\n\n" + " ".join(rng.choices(VOCABULARY, k=words)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--changed", type=int, default=20, help="documents rewritten before the incremental update")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        documents = os.path.join(directory, "docs")
+        os.makedirs(documents)
+        for i in range(args.documents):
+            write_document(documents, i, args.words, rng)
+
+        index = LocalSearchIndex(documents, os.path.join(directory, "index"))
+        print("full build      ", index.update())
+        print("unchanged update", index.update())
+        for i in rng.sample(range(args.documents), args.changed):
+            write_document(documents, i, args.words + 1, rng)
+        print("incremental     ", index.update())
+
+        # A fresh index maps the files written above, like a new process would
+        index.close()
+        index = LocalSearchIndex(documents, os.path.join(directory, "index"))
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(rng.choices(VOCABULARY, k=4))
+            started_at = time.perf_counter()
+            index.search(query, max_results=3)
+            latencies.append((time.perf_counter() - started_at) * 1000)
+        latencies.sort()
+        print(
+            f"query p50 {percentile(latencies, 0.5):.2f}ms p95 {percentile(latencies, 0.95):.2f}ms "
+            f"max {latencies[-1]:.2f}ms"
+        )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Model swaps and wall time of concurrent research runs, calling Ollama directly vs. through `ModelScheduler`.
+
+Every run alternates query/reflection and summarization models like `deep_research_agent.py`. Runs differ like real
+ones do: they summarize 1 to 3 queries per loop and their searches take 0 to --search-ms. The stand-in server handles
+one call at a time in arrival order, like Ollama with `OLLAMA_NUM_PARALLEL=1`, and charges --swap-ms whenever the
+requested model isn't the one it has loaded.
+
+--uniform runs identical runs in lockstep, which the server's own queue already groups by model, the scheduler has
+nothing to gain there. --runs 1 shows what it costs a run that has the server to itself.
+
+python -m agent.benchmarks.model_swaps --runs 8 --loops 3 --call-ms 20 --swap-ms 200 --search-ms 30
+"""
+
+import argparse
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.shared.model_scheduler import ModelScheduler
+
+QUERY_MODEL = "qwen2.5:14b-instruct-q8_0"
+SUMMARY_MODEL = "deepseek-r1:14b"
+
+
+class StubOllama:
+    def __init__(self, call_ms: float, swap_ms: float):
+        self.call_ms = call_ms
+        self.swap_ms = swap_ms
+        self.loaded = None
+        self.swaps = 0
+        self.condition = threading.Condition()
+        self.tickets = itertools.count()
+        self.serving = 0
+
+    def call(self, model: str):
+        with self.condition:
+            ticket = next(self.tickets)
+            self.condition.wait_for(lambda: self.serving == ticket)
+        if model != self.loaded:
+            self.swaps += 1 if self.loaded else 0
+            self.loaded = model
+            time.sleep(self.swap_ms / 1000)
+        time.sleep(self.call_ms / 1000)
+        with self.condition:
+            self.serving += 1
+            self.condition.notify_all()
+
+
+def research_run(call, index: int, args):
+    run_id = f"run-{index}"
+    queries, search_ms = (1, 0) if args.uniform else (1 + index % 3, args.search_ms * (index % 4) / 3)
+    call(QUERY_MODEL, run_id)
+    for _ in range(args.loops):
+        time.sleep(search_ms / 1000)
+        for _ in range(queries):
+            call(SUMMARY_MODEL, run_id)
+        call(QUERY_MODEL, run_id)
+
+
+def measure(args, scheduler: ModelScheduler = None) -> tuple[float, int]:
+    server = StubOllama(args.call_ms, args.swap_ms)
+    if scheduler:
+        call = lambda model, run_id: scheduler.run(model, lambda: server.call(model), run_id)
+    else:
+        call = lambda model, run_id: server.call(model)
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.runs) as pool:
+        list(pool.map(lambda index: research_run(call, index, args), range(args.runs)))
+    return time.perf_counter() - started_at, server.swaps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=8)
+    parser.add_argument("--loops", type=int, default=3)
+    parser.add_argument("--call-ms", type=float, default=20)
+    parser.add_argument("--swap-ms", type=float, default=200)
+    parser.add_argument("--search-ms", type=float, default=30)
+    parser.add_argument("--uniform", action="store_true")
+    parser.add_argument("--max-wait", type=float, default=0.05)
+    args = parser.parse_args()
+
+    direct_s, direct_swaps = measure(args)
+    scheduler = ModelScheduler(max_wait=args.max_wait)
+    scheduled_s, scheduled_swaps = measure(args, scheduler)
+    metrics = scheduler.metrics()
+    scheduler.close()
+
+    print(f"{'':<12}{'wall':>10}{'swaps':>8}{'avg queue':>12}")
+    print(f"{'direct':<12}{direct_s:>9.2f}s{direct_swaps:>8}{'-':>12}")
+    print(f"{'scheduled':<12}{scheduled_s:>9.2f}s{scheduled_swaps:>8}{metrics['avg_queue_ms']:>10.1f}ms")
+    print("swaps per run:", {run_id: run["swaps"] for run_id, run in sorted(metrics["runs"].items())})
+
+
+if __name__ == "__main__":
+    main()
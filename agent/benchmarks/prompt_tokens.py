@@ -0,0 +1,35 @@
+"""Planner prompt tokens per endpoint, Python-repr rendering vs. `render_endpoint`.
+
+python -m agent.benchmarks.prompt_tokens agent/dataset/openapi.yaml --env petstore --tags pet store user
+"""
+
+import argparse
+
+from agent.shared.spec_render import render_endpoint, DEFAULT_MAX_DEPTH
+from agent.shared.tokens import estimate_tokens
+from agent.shared.utils import reduce_openapi_spec, escape_with_double_curly_braces
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filepath")
+    parser.add_argument("--env", default="dev")
+    parser.add_argument("--tags", nargs="+", default=[])
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH)
+    args = parser.parse_args()
+
+    spec = reduce_openapi_spec(args.filepath, target_server_env=args.env, target_tags=args.tags)
+    print(f"{'endpoint':<40}{'repr':>8}{'compact':>10}{'saved':>8}")
+    total_before, total_after = 0, 0
+    for endpoint in spec.endpoints:
+        before = estimate_tokens(escape_with_double_curly_braces(endpoint))
+        after = estimate_tokens(escape_with_double_curly_braces(render_endpoint(endpoint, args.max_depth)))
+        total_before += before
+        total_after += after
+        print(f"{endpoint[0][:39]:<40}{before:>8}{after:>10}{1 - after / before:>8.0%}")
+    if spec.endpoints:
+        print(f"{'total':<40}{total_before:>8}{total_after:>10}{1 - total_after / total_before:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Search calls and wall time of repeated research runs, uncached vs. `SearchResultCache`.
+
+Every run searches the same topic queries, reflection loops regenerate them with different case and punctuation.
+The stand-in backend charges --search-ms per call, like a Tavily round-trip.
+
+python -m agent.benchmarks.search_cache --runs 3 --queries 5 --search-ms 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from agent.shared.search import SearchBackend, SearchResultCache, search
+
+
+class StubSearchBackend(SearchBackend):
+    name = "stub"
+
+    def __init__(self, search_ms: float):
+        self.search_ms = search_ms
+        self.calls = 0
+
+    def search(self, query: str, max_results: int, include_raw_content: bool, **params) -> dict:
+        self.calls += 1
+        time.sleep(self.search_ms / 1000)
+        results = [
+            {"title": f"{query} {i}", "url": f"https://example.com/{i}", "content": query, "raw_content": query * 50}
+            for i in range(max_results)
+        ]
+        return {"query": query, "results": results}
+
+
+def run(queries: list[str], runs: int, search_ms: float, cache: SearchResultCache = None) -> tuple[int, float]:
+    backend = StubSearchBackend(search_ms)
+    started_at = time.perf_counter()
+    for _ in range(runs):
+        for query in queries:
+            search(query, max_results=3, include_raw_content=True, cache=cache, backend=backend)
+            search(f"  {query.upper()}? ", max_results=3, include_raw_content=True, cache=cache, backend=backend)
+    return backend.calls, time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--search-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    queries = [f"kubernetes topic aspect {i}" for i in range(args.queries)]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SearchResultCache("benchmark", path=os.path.join(directory, "search_cache.sqlite3"))
+        print(f"{'':<10}{'searches':>10}{'wall':>10}")
+        for name, search_cache in (("uncached", None), ("cached", cache)):
+            calls, wall = run(queries, args.runs, args.search_ms, search_cache)
+            print(f"{name:<10}{calls:>10}{wall * 1000:>8.0f}ms")
+        print("cache", cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Cold and warm load times of `reduce_openapi_spec`.
+
+python -m agent.benchmarks.spec_load agent/dataset/openapi.yaml --env petstore --tags pet store user
+"""
+
+import argparse
+import tempfile
+import time
+
+import yaml
+
+from agent.shared import utils
+from agent.shared.spec_cache import SafeLoader
+from agent.shared.utils import reduce_openapi_spec
+
+
+def timed(func, *args, **kwargs) -> tuple[float, object]:
+    started_at = time.perf_counter()
+    result = func(*args, **kwargs)
+    return (time.perf_counter() - started_at) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filepath")
+    parser.add_argument("--env", default="dev")
+    parser.add_argument("--tags", nargs="+", default=[])
+    parser.add_argument("--no-dereference", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.filepath, "rb") as f:
+        content = f.read()
+    pure_ms, _ = timed(yaml.load, content, Loader=yaml.SafeLoader)
+    c_ms, _ = timed(yaml.load, content, Loader=SafeLoader)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        options = dict(
+            target_server_env=args.env,
+            target_tags=args.tags,
+            dereference=not args.no_dereference,
+        )
+        uncached_ms, spec = timed(reduce_openapi_spec, args.filepath, cache_dir=None, **options)
+        reused_ms, _ = timed(reduce_openapi_spec, args.filepath, cache_dir=None, **options)
+        # A cold cache in a fresh process has no parsed spec in memory either
+        utils._openapi_reducers.clear()
+        cold_ms, _ = timed(reduce_openapi_spec, args.filepath, cache_dir=cache_dir, **options)
+        warm_ms, _ = timed(reduce_openapi_spec, args.filepath, cache_dir=cache_dir, **options)
+
+    print(f"endpoints             {len(spec.endpoints)}")
+    print(f"yaml SafeLoader       {pure_ms:10.2f} ms")
+    print(f"yaml {SafeLoader.__name__:<16} {c_ms:10.2f} ms")
+    print(f"reduce (no cache)     {uncached_ms:10.2f} ms")
+    print(f"reduce (same process) {reused_ms:10.2f} ms")
+    print(f"reduce (cold cache)   {cold_ms:10.2f} ms")
+    print(f"reduce (warm cache)   {warm_ms:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Fit the `TokenCounter` approximation of a model to its real tokenizer and report the error before and after.
+
+The text files are split into paragraphs, half of them fit the weights and the other half measure the error. The
+fitted weights are stored in the calibration file `TokenCounter` reads, so machines without the tokenizer files get
+the calibrated approximation.
+
+python -m agent.benchmarks.token_calibration qwen2.5:14b-instruct-q8_0 docs/*.md --store
+"""
+
+import argparse
+
+import numpy as np
+
+from agent.shared.tokens import (
+    TokenWeights,
+    token_features,
+    load_tokenizer,
+    store_token_weights,
+    DEFAULT_TOKEN_CALIBRATION_PATH,
+)
+
+
+def errors(weights: TokenWeights, samples: list[tuple[tuple[int, int, int, int], int]]) -> tuple[float, float]:
+    """Mean absolute relative error and total relative error of the approximation."""
+    estimated = [weights.cost(features) for features, _ in samples]
+    actual = [tokens for _, tokens in samples]
+    mean_error = sum(abs(e - a) / a for e, a in zip(estimated, actual)) / len(samples)
+    return mean_error, sum(estimated) / sum(actual) - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--store", action="store_true", help="write the fitted weights to the calibration file")
+    parser.add_argument("--path", default=DEFAULT_TOKEN_CALIBRATION_PATH)
+    args = parser.parse_args()
+
+    tokenizer = load_tokenizer(args.model, allow_download=True)
+    if tokenizer is None:
+        parser.error(f"no tokenizer for {args.model}, install transformers and add it to TOKENIZER_REPOS")
+
+    paragraphs = []
+    for filepath in args.files:
+        with open(filepath, "r") as f:
+            paragraphs.extend(paragraph for paragraph in f.read().split("\n\n") if paragraph.strip())
+    samples = [
+        (token_features(paragraph), len(tokenizer.encode(paragraph, add_special_tokens=False)))
+        for paragraph in paragraphs
+    ]
+    train, test = samples[::2], samples[1::2] or samples[::2]
+
+    solution, *_ = np.linalg.lstsq(
+        np.array([features for features, _ in train], dtype=float),
+        np.array([tokens for _, tokens in train], dtype=float),
+        rcond=None,
+    )
+    fitted = TokenWeights(**dict(zip(("latin", "digit", "hangul", "symbol"), (max(w, 0.0) for w in solution))))
+
+    print(f"{len(train)} paragraphs fitted, {len(test)} measured, {sum(t for _, t in samples)} tokens")
+    print(f"{'weights':<12}{'latin':>8}{'digit':>8}{'hangul':>8}{'symbol':>8}{'mean err':>10}{'total err':>11}")
+    for name, weights in (("estimate", TokenWeights()), ("fitted", fitted)):
+        mean_error, total_error = errors(weights, test)
+        print(
+            f"{name:<12}{weights.latin:>8.3f}{weights.digit:>8.3f}{weights.hangul:>8.3f}{weights.symbol:>8.3f}"
+            f"{mean_error:>10.1%}{total_error:>+11.1%}"
+        )
+
+    if args.store:
+        store_token_weights(args.model, fitted, args.path)
+        print(f"stored in {args.path}")
+
+
+if __name__ == "__main__":
+    main()
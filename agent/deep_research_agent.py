@@ -1,23 +1,49 @@
-from typing import Literal
+from typing import Literal, Optional
 
 from dotenv import load_dotenv
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama
 from langgraph.constants import START, END
 from langgraph.graph import StateGraph
-from tavily import TavilyClient
 
+from agent.shared.context_budget import ContextBudget
+from agent.shared.instrumentation import get_recorder
+from agent.shared.llm import get_chat_ollama, get_structured_chat_ollama, set_model_scheduler
+from agent.shared.llm_cache import LLMResponseCache
+from agent.shared.model_scheduler import ModelScheduler
+from agent.shared.near_duplicates import NearDuplicateIndex, drop_near_duplicates
+from agent.shared.novelty import information_gain, has_converged
 from agent.shared.prompts import QUERY_WRITER_INSTRUCTIONS, SUMMARIZE_INSTRUCTIONS, REFLECTION_INSTRUCTIONS
+from agent.shared.reasoning import invoke_with_reasoning_budget
 from agent.shared.response_formats import QueryWriterResponse, ReflectionResponse
+from agent.shared.search import SearchResultCache, search
 from agent.shared.states import DeepResearchState
-from agent.shared.utils import clean_deepseek_chat_response, draw_graph_png
+from agent.shared.streaming import stream_graph, print_stream_event
+from agent.shared.tokens import get_token_counter
+from agent.shared.utils import draw_graph_png
 
 load_dotenv()
 
+# Serves repeated query, summary and reflection prompts from disk, set to None to always call the model
+llm_cache = LLMResponseCache("deep_research_agent")
+# Serves repeated searches from disk, set to None to always search
+search_cache = SearchResultCache("deep_research_agent")
+# Runs the query, summary and reflection calls of concurrent runs grouped by model so Ollama swaps less. Only pays off
+# when several runs with different call patterns share one Ollama server (see benchmarks/model_swaps.py), set to
+# ModelScheduler() then
+model_scheduler: Optional[ModelScheduler] = None
+set_model_scheduler(model_scheduler)
+
+# Reasoning tokens deepseek may spend on a summary before it's stopped and asked again without thinking
+MAX_REASONING_TOKENS = 2048
+SUMMARY_MODEL = "deepseek-r1:14b"
+# Context window the summary model runs with, the topic, summary and search results are fit into it
+SUMMARY_NUM_CTX = 8192
+SUMMARY_ANSWER_TOKENS = 1024
+
 
 def generate_query_node(state: DeepResearchState):
-    llm = ChatOllama(model="qwen2.5:14b-instruct-q8_0", temperature=0.1).with_structured_output(QueryWriterResponse)
+    llm = get_structured_chat_ollama(QueryWriterResponse, "qwen2.5:14b-instruct-q8_0", temperature=0.1, cache=llm_cache)
     prompt = ChatPromptTemplate.from_messages(
         [
             SystemMessage(
@@ -33,33 +59,53 @@ def generate_query_node(state: DeepResearchState):
 
 
 def web_search_node(state: DeepResearchState):
-    tavily_client = TavilyClient()
-    search_response = tavily_client.search(
-        query=state["research_query"],
-        max_results=1,
-        include_raw_content=True,
+    search_response = search(state["research_query"], max_results=1, include_raw_content=True, cache=search_cache)
+    # Mirrors, syndicated copies and tracking-parameter variants of earlier sources would only be summarized again
+    search_response, new_signatures, skipped = drop_near_duplicates(
+        search_response,
+        NearDuplicateIndex.from_signatures(state["source_signatures"]),
+        get_token_counter(SUMMARY_MODEL),
+        # Sources aren't cut to a fixed size here, at most the context window would have gone to one
+        max_tokens_per_source=SUMMARY_NUM_CTX,
     )
     return {
         "web_search_loop_count": state["web_search_loop_count"] + 1,
         "web_search_responses": state["web_search_responses"] + [search_response],
+        "source_signatures": new_signatures,
+        "skipped_sources": skipped["sources"],
+        "skipped_tokens": skipped["tokens"],
     }
 
 
 def summarize_source_node(state: DeepResearchState):
     research_topic = state["research_topic"]
-    summary = state["summary"]
-    web_search_response = state["web_search_responses"][-1]
+    results = state["web_search_responses"][-1]["results"]
+    # Every source was already covered, the summary stays as it is. No gain is recorded, the search found nothing
+    # new, which doesn't mean the topic is exhausted
+    if not results:
+        return {}
+
+    budget = ContextBudget(context_window=SUMMARY_NUM_CTX, reserved_output=MAX_REASONING_TOKENS + SUMMARY_ANSWER_TOKENS)
+    summary, sources = budget.allocate(
+        get_token_counter(SUMMARY_MODEL),
+        fixed=[SUMMARIZE_INSTRUCTIONS, research_topic, *(f"{result['title']}\n{result['url']}" for result in results)],
+        summary=state["summary"],
+        sources=[result.get("raw_content") or result["content"] for result in results],
+    )
+    web_search_results = "\n\n".join(
+        f"{result['title']}\n{result['url']}\n{source}" for result, source in zip(results, sources)
+    )
 
     if summary:
         human_message = (
             f"<User Input>\n{research_topic}\n<User Input>\n\n"
             f"<Existing Summary>\n{summary}\n<Existing Summary>\n\n"
-            f"<New Search Results>\n{web_search_response}\n<New Search Results>"
+            f"<New Search Results>\n{web_search_results}\n<New Search Results>"
         )
     else:
         human_message = (
             f"<User Input>\n{research_topic}\n<User Input>\n\n"
-            f"<Search Results>\n{web_search_response}\n<Search Results>"
+            f"<Search Results>\n{web_search_results}\n<Search Results>"
         )
 
     prompt = ChatPromptTemplate.from_messages(
@@ -68,16 +114,19 @@ def summarize_source_node(state: DeepResearchState):
             HumanMessage(content=human_message),
         ]
     )
-    llm = ChatOllama(model="deepseek-r1:14b", temperature=0.1)
-    chain = prompt | llm
-    chat_response = chain.invoke({"input": research_topic})
+    llm = get_chat_ollama(SUMMARY_MODEL, temperature=0.1, num_ctx=SUMMARY_NUM_CTX, cache=llm_cache)
+    summary, reasoning_stats = invoke_with_reasoning_budget(
+        llm, prompt.invoke({"input": research_topic}), max_reasoning_tokens=MAX_REASONING_TOKENS
+    )
     return {
-        "summary": clean_deepseek_chat_response(chat_response.content),
+        "summary": summary,
+        "reasoning_stats": [reasoning_stats.to_dict()],
+        "information_gains": [information_gain(state["summary"], summary)],
     }
 
 
 def reflect_on_summary_node(state: DeepResearchState):
-    llm = ChatOllama(model="qwen2.5:14b-instruct-q8_0", temperature=0.2).with_structured_output(ReflectionResponse)
+    llm = get_structured_chat_ollama(ReflectionResponse, "qwen2.5:14b-instruct-q8_0", temperature=0.2, cache=llm_cache)
     prompt = ChatPromptTemplate.from_messages(
         [
             SystemMessage(content=REFLECTION_INSTRUCTIONS.format(topic=state["research_topic"])),
@@ -108,10 +157,18 @@ def finalize_summary_node(state: DeepResearchState):
     }
 
 
-def router(state: DeepResearchState) -> Literal["finalize_summary_node", "web_search_node"]:
-    if state["web_search_loop_count"] <= state["max_web_search_loop_count"]:
+def convergence_router(state: DeepResearchState) -> Literal["finalize_summary_node", "reflect_on_summary_node"]:
+    if state["web_search_loop_count"] >= state["max_web_search_loop_count"]:
         return "finalize_summary_node"
 
+    # The last searches barely changed the summary, reflecting and searching again would not either
+    if has_converged(state["information_gains"]):
+        return "finalize_summary_node"
+
+    return "reflect_on_summary_node"
+
+
+def router(state: DeepResearchState) -> Literal["finalize_summary_node", "web_search_node"]:
     if state["keep_searching"]:
         return "web_search_node"
 
@@ -128,14 +185,17 @@ graph_builder.add_node("finalize_summary_node", finalize_summary_node)
 graph_builder.add_edge(START, "generate_query_node")
 graph_builder.add_edge("generate_query_node", "web_search_node")
 graph_builder.add_edge("web_search_node", "summarize_source_node")
-graph_builder.add_edge("summarize_source_node", "reflect_on_summary_node")
+graph_builder.add_conditional_edges("summarize_source_node", convergence_router)
 graph_builder.add_conditional_edges("reflect_on_summary_node", router)
 graph_builder.add_edge("finalize_summary_node", END)
 
 graph = graph_builder.compile()
 draw_graph_png("deep_research_agent.png", graph)
 
-stream = graph.stream(
+recorder = get_recorder()
+recorder.enabled = True
+events = stream_graph(
+    graph,
     {
         "research_topic": input("조사 주제:"),
         "web_search_loop_count": 0,
@@ -143,8 +203,22 @@ stream = graph.stream(
         "web_search_responses": [],
         "keep_searching": False,
         "summary": None,
-    }
+        "source_signatures": [],
+        "skipped_sources": 0,
+        "skipped_tokens": 0,
+        "information_gains": [],
+    },
+    token_nodes=["summarize_source_node"],
+    recorder=recorder,
 )
-for s in stream:
-    for agent, e in s.items():
-        print(agent, e, flush=True)
+for event in events:
+    print_stream_event(event)
+
+if llm_cache:
+    print("llm cache", llm_cache.stats())
+if search_cache:
+    print("search cache", search_cache.stats())
+if model_scheduler:
+    print("model scheduler", model_scheduler.metrics())
+print(recorder.format_summary())
+recorder.export("deep_research_agent")
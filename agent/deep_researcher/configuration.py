@@ -3,6 +3,8 @@ from dataclasses import dataclass, fields
 from typing import Any, Optional
 
 from langchain_core.runnables import RunnableConfig
+
+from agent.shared.novelty import DEFAULT_CONVERGENCE_PATIENCE, DEFAULT_MIN_INFORMATION_GAIN
 from dataclasses import dataclass
 
 from enum import Enum
@@ -12,6 +14,7 @@ class SearchAPI(Enum):
     PERPLEXITY = "perplexity"
     TAVILY = "tavily"
     DUCKDUCKGO = "duckduckgo"
+    LOCAL = "local"
 
 
 @dataclass(kw_only=True)
@@ -21,8 +24,22 @@ class Configuration:
     max_web_research_loops: int = int(os.environ.get("MAX_WEB_RESEARCH_LOOPS", "3"))
     local_llm: str = os.environ.get("OLLAMA_MODEL", "qwen2.5:14b-instruct-q8_0")
     search_api: SearchAPI = SearchAPI(os.environ.get("SEARCH_API", SearchAPI.TAVILY.value))  # Default to DUCKDUCKGO
+    local_search_dir: str = os.environ.get("LOCAL_SEARCH_DIR", "docs")  # Documents indexed for the local search API
     fetch_full_page: bool = os.environ.get("FETCH_FULL_PAGE", "False").lower() in ("true", "1", "t")
     ollama_base_url: str = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434/")
+    max_reasoning_tokens: int = int(os.environ.get("MAX_REASONING_TOKENS", "2048"))  # <think> budget of the summarizer
+    # Context window the model runs with, the summarizer prompt is fit into it
+    num_ctx: int = int(os.environ.get("OLLAMA_NUM_CTX", "8192"))
+    # Queries searched and summarized in parallel per loop, merged into the running summary in one step
+    num_queries: int = int(os.environ.get("NUM_QUERIES", "1"))
+    max_results_per_query: int = int(os.environ.get("MAX_RESULTS_PER_QUERY", "1"))
+    max_tokens_per_source: int = int(os.environ.get("MAX_TOKENS_PER_SOURCE", "1000"))
+    # Estimated shingle similarity from which a source counts as already covered by an earlier one
+    near_duplicate_threshold: float = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+    # Research stops once convergence_patience summary updates in a row each were less than min_information_gain new
+    # content, loops without new sources don't count. Defaults and their env vars are in agent.shared.novelty
+    min_information_gain: float = DEFAULT_MIN_INFORMATION_GAIN
+    convergence_patience: int = DEFAULT_CONVERGENCE_PATIENCE
 
     @classmethod
     def from_runnable_config(cls, config: Optional[RunnableConfig] = None) -> "Configuration":
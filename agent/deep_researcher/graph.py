@@ -4,44 +4,71 @@ from typing_extensions import Literal
 
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_ollama import ChatOllama
 from langgraph.graph import START, END, StateGraph
+from langgraph.types import Send
 
 from agent.deep_researcher.configuration import Configuration
-from agent.deep_researcher.prompts import query_writer_instructions, summarizer_instructions, reflection_instructions
-from agent.deep_researcher.state import SummaryState, SummaryStateInput, SummaryStateOutput
-from agent.deep_researcher.utils import tavily_search, deduplicate_and_format_sources, format_sources
+from agent.deep_researcher.prompts import (
+    query_writer_instructions,
+    summarizer_instructions,
+    reflection_instructions,
+    multi_query_writer_instructions,
+    multi_reflection_instructions,
+)
+from agent.deep_researcher.state import SummaryState, SummaryStateInput, SummaryStateOutput, QueryState
+from agent.deep_researcher.utils import tavily_search, local_search, deduplicate_and_format_sources, format_sources
+from agent.shared.context_budget import ContextBudget
+from agent.shared.instrumentation import get_recorder
+from agent.shared.llm import get_chat_ollama
+from agent.shared.llm_cache import LLMResponseCache
+from agent.shared.near_duplicates import NearDuplicateIndex, drop_near_duplicates
+from agent.shared.novelty import information_gain, has_converged
+from agent.shared.reasoning import invoke_with_reasoning_budget
+from agent.shared.search import SearchResultCache
+from agent.shared.streaming import stream_graph, print_stream_event
+from agent.shared.summary_sections import fit_sections, has_sections, merge_sections, parse_sections, render_sections
+from agent.shared.tokens import get_token_counter
 from agent.shared.utils import draw_graph_png
 
-
-# Nodes
-def generate_query(state: SummaryState, config: RunnableConfig):
-    """Generate a query for web search"""
-
-    # Format the prompt
-    query_writer_instructions_formatted = query_writer_instructions.format(research_topic=state.research_topic)
-
-    # Generate a query
-    configurable = Configuration.from_runnable_config(config)
-    llm_json_mode = ChatOllama(
-        base_url=configurable.ollama_base_url, model=configurable.local_llm, temperature=0, format="json"
-    )
-    result = llm_json_mode.invoke(
-        [
-            SystemMessage(content=query_writer_instructions_formatted),
-            HumanMessage(content=f"Generate a query for web search:"),
-        ]
+# Serves repeated research prompts from disk, set to None to always call the model
+llm_cache = LLMResponseCache("deep_researcher")
+# Serves repeated searches from disk, set to None to always search
+search_cache = SearchResultCache("deep_researcher")
+
+# Tokens kept free for the summary itself, on top of the reasoning budget
+SUMMARY_ANSWER_TOKENS = 1024
+# Tags and labels around the summary prompt parts, counted against the budget
+SUMMARY_PROMPT_MARKUP = "<User Input>" * 2 + "<Existing Summary>" * 2 + "<New Search Results>" * 2
+
+
+# Helpers
+def get_json_llm(configurable: Configuration):
+    return get_chat_ollama(
+        configurable.local_llm,
+        temperature=0,
+        base_url=configurable.ollama_base_url,
+        num_ctx=int(configurable.num_ctx),
+        format="json",
+        cache=llm_cache,
     )
-    query = json.loads(result.content)
 
-    return {"search_query": query['query']}
 
+def parse_queries(content: str, key: str, number_of_queries: int) -> list[str]:
+    """Distinct queries of a JSON list of query strings or {"query": ...} objects, at most number_of_queries."""
+    try:
+        items = json.loads(content).get(key) or []
+    except (ValueError, AttributeError):
+        return []
+    queries = []
+    for item in items if isinstance(items, list) else []:
+        query = item.get("query") if isinstance(item, dict) else item
+        if isinstance(query, str) and query.strip() and query.strip() not in queries:
+            queries.append(query.strip())
+    return queries[:number_of_queries]
 
-def web_research(state: SummaryState, config: RunnableConfig):
-    """Gather information from the web"""
 
-    # Configure
-    configurable = Configuration.from_runnable_config(config)
+def search(query: str, configurable: Configuration):
+    """Search the web with the configured search API"""
 
     # Handle both cases for search_api:
     # 1. When selected in Studio UI -> returns a string (e.g. "tavily")
@@ -53,73 +80,301 @@ def web_research(state: SummaryState, config: RunnableConfig):
 
     # Search the web
     if search_api == "tavily":
-        search_results = tavily_search(state.search_query, include_raw_content=True, max_results=1)
-        search_str = deduplicate_and_format_sources(
-            search_results, max_tokens_per_source=1000, include_raw_content=True
+        return tavily_search(
+            query, include_raw_content=True, max_results=int(configurable.max_results_per_query), cache=search_cache
+        )
+    elif search_api == "local":
+        return local_search(
+            query,
+            configurable.local_search_dir,
+            include_raw_content=True,
+            max_results=int(configurable.max_results_per_query),
         )
     # elif search_api == "perplexity":
     #     search_results = perplexity_search(state.search_query, state.research_loop_count)
-    #     search_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=1000, include_raw_content=False)
     # elif search_api == "duckduckgo":
     #     search_results = duckduckgo_search(state.search_query, max_results=3, fetch_full_page=configurable.fetch_full_page)
-    #     search_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=1000, include_raw_content=True)
     else:
         raise ValueError(f"Unsupported search API: {configurable.search_api}")
 
-    return {
-        "sources_gathered": [format_sources(search_results)],
-        "research_loop_count": state.research_loop_count + 1,
-        "web_research_results": [search_str],
-    }
 
+def drop_seen_sources(search_results: dict, configurable: Configuration, source_signatures: list[dict]):
+    """Drop the search results the run has already seen and format the new ones for the prompt
 
-def summarize_sources(state: SummaryState, config: RunnableConfig):
-    """Summarize the gathered sources"""
+    Returns:
+        The new search results, their prompt-ready text (empty without new results), the signatures of the new
+        sources and the skipped sources and tokens
+    """
+
+    # Mirrors, syndicated copies and tracking-parameter variants of earlier sources would only be summarized again
+    token_counter = get_token_counter(configurable.local_llm)
+    search_results, new_signatures, skipped = drop_near_duplicates(
+        search_results,
+        NearDuplicateIndex.from_signatures(source_signatures, threshold=float(configurable.near_duplicate_threshold)),
+        token_counter,
+        max_tokens_per_source=int(configurable.max_tokens_per_source),
+    )
+    search_str = ""
+    if search_results["results"]:
+        search_str = deduplicate_and_format_sources(
+            search_results,
+            max_tokens_per_source=int(configurable.max_tokens_per_source),
+            include_raw_content=True,
+            token_counter=token_counter,
+        )
 
-    # Existing summary
-    existing_summary = state.running_summary
+    return search_results, search_str, new_signatures, skipped
 
-    # Most recent web research
-    most_recent_web_research = state.web_research_results[-1]
+
+def summarize(research_topic: str, summary_sections: dict[str, str], new_results: list[str], config: RunnableConfig):
+    """Summarize new results into the summary's sections
+
+    Returns:
+        The merged sections, the new and updated sections the model wrote and the reasoning stats
+
+    The model only writes the new and updated sections and they are merged here, so its output doesn't grow with
+    the summary.
+    """
+
+    configurable = Configuration.from_runnable_config(config)
+
+    # Fit the existing summary and the new results into the model's context window
+    budget = ContextBudget(
+        context_window=int(configurable.num_ctx),
+        reserved_output=int(configurable.max_reasoning_tokens) + SUMMARY_ANSWER_TOKENS,
+    )
+    token_counter = get_token_counter(configurable.local_llm)
+    rendered_summary = render_sections(summary_sections)
+    existing_summary, new_results = budget.allocate(
+        token_counter,
+        fixed=[summarizer_instructions, research_topic, SUMMARY_PROMPT_MARKUP],
+        summary=rendered_summary,
+        sources=new_results,
+    )
+    # Show whole sections only, the model would take a cut-off section for complete and its update would drop the rest
+    omitted_sections = set()
+    if existing_summary != rendered_summary:
+        existing_summary, omitted_sections = fit_sections(
+            summary_sections, token_counter, token_counter.count(existing_summary)
+        )
+    new_research = "\n\n".join(new_results)
 
     # Build the human message
     if existing_summary:
         human_message_content = (
-            f"<User Input> \n {state.research_topic} \n <User Input>\n\n"
+            f"<User Input> \n {research_topic} \n <User Input>\n\n"
             f"<Existing Summary> \n {existing_summary} \n <Existing Summary>\n\n"
-            f"<New Search Results> \n {most_recent_web_research} \n <New Search Results>"
+            f"<New Search Results> \n {new_research} \n <New Search Results>"
         )
     else:
         human_message_content = (
-            f"<User Input> \n {state.research_topic} \n <User Input>\n\n"
-            f"<Search Results> \n {most_recent_web_research} \n <Search Results>"
+            f"<User Input> \n {research_topic} \n <User Input>\n\n"
+            f"<Search Results> \n {new_research} \n <Search Results>"
         )
 
-    # Run the LLM
+    # Run the LLM, <think> blocks of reasoning models are dropped as they stream in
+    llm = get_chat_ollama(
+        configurable.local_llm,
+        temperature=0,
+        base_url=configurable.ollama_base_url,
+        num_ctx=int(configurable.num_ctx),
+        cache=llm_cache,
+    )
+    updated_sections, reasoning_stats = invoke_with_reasoning_budget(
+        llm,
+        [SystemMessage(content=summarizer_instructions), HumanMessage(content=human_message_content)],
+        config,
+        max_reasoning_tokens=int(configurable.max_reasoning_tokens),
+    )
+    delta = parse_sections(updated_sections)
+    # Without headings there is no telling which sections the output updates, it's added to rather than replacing one
+    if not has_sections(updated_sections):
+        omitted_sections |= set(delta)
+    return merge_sections(summary_sections, delta, omitted_sections), delta, reasoning_stats
+
+
+# Nodes
+def generate_query(state: SummaryState, config: RunnableConfig):
+    """Generate a query for web search, or num_queries diverse queries to research in parallel"""
+
     configurable = Configuration.from_runnable_config(config)
-    llm = ChatOllama(base_url=configurable.ollama_base_url, model=configurable.local_llm, temperature=0)
-    result = llm.invoke([SystemMessage(content=summarizer_instructions), HumanMessage(content=human_message_content)])
+    llm_json_mode = get_json_llm(configurable)
+    number_of_queries = int(configurable.num_queries)
+
+    if number_of_queries > 1:
+        result = llm_json_mode.invoke(
+            [
+                SystemMessage(
+                    content=multi_query_writer_instructions.format(
+                        research_topic=state.research_topic, number_of_queries=number_of_queries
+                    )
+                ),
+                HumanMessage(content=f"Generate {number_of_queries} queries for web search:"),
+            ]
+        )
+        queries = parse_queries(result.content, "queries", number_of_queries)
+        return {"search_queries": queries or [state.research_topic]}
 
-    running_summary = result.content
+    # Format the prompt
+    query_writer_instructions_formatted = query_writer_instructions.format(research_topic=state.research_topic)
 
-    # TODO: This is a hack to remove the <think> tags w/ Deepseek models
-    # It appears very challenging to prompt them out of the responses
-    while "<think>" in running_summary and "</think>" in running_summary:
-        start = running_summary.find("<think>")
-        end = running_summary.find("</think>") + len("</think>")
-        running_summary = running_summary[:start] + running_summary[end:]
+    # Generate a query
+    result = llm_json_mode.invoke(
+        [
+            SystemMessage(content=query_writer_instructions_formatted),
+            HumanMessage(content=f"Generate a query for web search:"),
+        ]
+    )
+    query = json.loads(result.content)
 
-    return {"running_summary": running_summary}
+    return {"search_query": query['query']}
+
+
+def web_research(state: SummaryState, config: RunnableConfig):
+    """Gather information from the web"""
+
+    configurable = Configuration.from_runnable_config(config)
+    search_results, search_str, new_signatures, skipped = drop_seen_sources(
+        search(state.search_query, configurable), configurable, state.source_signatures
+    )
+
+    return {
+        "sources_gathered": [format_sources(search_results)] if search_results["results"] else [],
+        "research_loop_count": state.research_loop_count + 1,
+        "web_research_results": [search_str],
+        "source_signatures": new_signatures,
+        "skipped_sources": skipped["sources"],
+        "skipped_tokens": skipped["tokens"],
+    }
+
+
+def summarize_sources(state: SummaryState, config: RunnableConfig):
+    """Summarize the gathered sources"""
+
+    # Every source was already covered, the summary stays as it is. No gain is recorded, the search found nothing
+    # new, which doesn't mean the topic is exhausted
+    if not state.web_research_results[-1]:
+        return {}
+
+    summary_sections, delta, reasoning_stats = summarize(
+        state.research_topic, state.summary_sections, [state.web_research_results[-1]], config
+    )
+
+    return {
+        "summary_sections": summary_sections,
+        "running_summary": render_sections(summary_sections),
+        "reasoning_stats": [reasoning_stats.to_dict()],
+        "information_gains": [information_gain(state.running_summary, render_sections(delta))],
+    }
+
+
+def research_query(state: QueryState, config: RunnableConfig):
+    """Search one of the parallel queries, deduplicate_sources drops what the run has already seen"""
+
+    configurable = Configuration.from_runnable_config(config)
+    search_results = search(state.search_query, configurable)
+
+    return {
+        "query_results": [{"loop": state.research_loop_count, "query": state.search_query, "results": search_results}]
+    }
+
+
+def deduplicate_sources(state: SummaryState, config: RunnableConfig):
+    """Drop the sources of this loop's parallel queries seen earlier in the run or in another of the queries"""
+
+    configurable = Configuration.from_runnable_config(config)
+    # Branches searching overlapping queries often return the same sources, each must be summarized only once
+    source_signatures = list(state.source_signatures)
+    update = {
+        "source_signatures": [],
+        "skipped_sources": 0,
+        "skipped_tokens": 0,
+        "sources_gathered": [],
+        "web_research_results": [],
+        "query_sources": [],
+    }
+    for query_result in state.query_results:
+        if query_result["loop"] != state.research_loop_count:
+            continue
+        search_results, search_str, new_signatures, skipped = drop_seen_sources(
+            query_result["results"], configurable, source_signatures
+        )
+        source_signatures += new_signatures
+        update["source_signatures"] += new_signatures
+        update["skipped_sources"] += skipped["sources"]
+        update["skipped_tokens"] += skipped["tokens"]
+        if search_str:
+            update["sources_gathered"].append(format_sources(search_results))
+            update["web_research_results"].append(search_str)
+            update["query_sources"].append(
+                {"loop": state.research_loop_count, "query": query_result["query"], "search_str": search_str}
+            )
+
+    return update
+
+
+def summarize_query(state: QueryState, config: RunnableConfig):
+    """Summarize the new sources of one of the parallel queries on their own"""
+
+    query_sections, _, reasoning_stats = summarize(state.research_topic, {}, [state.search_str], config)
+
+    return {
+        "query_summaries": [
+            {"loop": state.research_loop_count, "query": state.search_query, "summary": render_sections(query_sections)}
+        ],
+        "reasoning_stats": [reasoning_stats.to_dict()],
+    }
+
+
+def merge_summaries(state: SummaryState, config: RunnableConfig):
+    """Merge the summaries of this loop's parallel queries into the running summary in one step"""
+
+    query_summaries = [
+        f"Query: {query_summary['query']}\n{query_summary['summary']}"
+        for query_summary in state.query_summaries
+        if query_summary["loop"] == state.research_loop_count
+    ]
+    # As in summarize_sources, a loop whose sources were all covered records no gain
+    if not query_summaries:
+        return {"research_loop_count": state.research_loop_count + 1}
+
+    summary_sections, delta, reasoning_stats = summarize(
+        state.research_topic, state.summary_sections, query_summaries, config
+    )
+
+    return {
+        "summary_sections": summary_sections,
+        "running_summary": render_sections(summary_sections),
+        "research_loop_count": state.research_loop_count + 1,
+        "reasoning_stats": [reasoning_stats.to_dict()],
+        "information_gains": [information_gain(state.running_summary, render_sections(delta))],
+    }
 
 
 def reflect_on_summary(state: SummaryState, config: RunnableConfig):
-    """Reflect on the summary and generate a follow-up query"""
+    """Reflect on the summary and generate a follow-up query, or num_queries of them"""
 
     # Generate a query
     configurable = Configuration.from_runnable_config(config)
-    llm_json_mode = ChatOllama(
-        base_url=configurable.ollama_base_url, model=configurable.local_llm, temperature=0, format="json"
-    )
+    llm_json_mode = get_json_llm(configurable)
+    number_of_queries = int(configurable.num_queries)
+
+    if number_of_queries > 1:
+        result = llm_json_mode.invoke(
+            [
+                SystemMessage(
+                    content=multi_reflection_instructions.format(
+                        research_topic=state.research_topic, number_of_queries=number_of_queries
+                    )
+                ),
+                HumanMessage(
+                    content=f"Identify knowledge gaps and generate follow-up web search queries based on our existing knowledge: {state.running_summary}"
+                ),
+            ]
+        )
+        queries = parse_queries(result.content, "follow_up_queries", number_of_queries)
+        return {"search_queries": queries or [f"Tell me more about {state.research_topic}"]}
+
     result = llm_json_mode.invoke(
         [
             SystemMessage(content=reflection_instructions.format(research_topic=state.research_topic)),
@@ -152,14 +407,60 @@ def finalize_summary(state: SummaryState):
     return {"running_summary": state.running_summary}
 
 
-def route_research(state: SummaryState, config: RunnableConfig) -> Literal["finalize_summary", "web_research"]:
-    """Route the research based on the follow-up query"""
+def dispatch_research(state: SummaryState, config: RunnableConfig):
+    """Research the query in web_research, or each of the parallel queries in its own research_query branch"""
 
     configurable = Configuration.from_runnable_config(config)
-    if state.research_loop_count <= configurable.max_web_research_loops:
+    if int(configurable.num_queries) <= 1:
         return "web_research"
-    else:
+
+    # The branches join at deduplicate_sources, which drops the sources they have in common before summarizing
+    return [
+        Send(
+            "research_query",
+            QueryState(
+                research_topic=state.research_topic,
+                search_query=search_query,
+                research_loop_count=state.research_loop_count,
+            ),
+        )
+        for search_query in state.search_queries
+    ]
+
+
+def dispatch_summaries(state: SummaryState):
+    """Summarize each query with new sources in its own summarize_query branch, or merge right away without any"""
+
+    # The branches join at merge_summaries, which folds their summaries into the running summary at once
+    return [
+        Send(
+            "summarize_query",
+            QueryState(
+                research_topic=state.research_topic,
+                search_query=query_source["query"],
+                research_loop_count=state.research_loop_count,
+                search_str=query_source["search_str"],
+            ),
+        )
+        for query_source in state.query_sources
+        if query_source["loop"] == state.research_loop_count
+    ] or "merge_summaries"
+
+
+def route_research(state: SummaryState, config: RunnableConfig) -> Literal["reflect_on_summary", "finalize_summary"]:
+    """Finish once the loops are used up or the summary stopped gaining new information, otherwise look for gaps"""
+
+    configurable = Configuration.from_runnable_config(config)
+    if state.research_loop_count > int(configurable.max_web_research_loops):
+        return "finalize_summary"
+    # Narrow topics run out of new information before the loops do, each further loop would cost a search and LLM calls
+    if has_converged(
+        state.information_gains,
+        min_gain=float(configurable.min_information_gain),
+        patience=int(configurable.convergence_patience),
+    ):
         return "finalize_summary"
+    return "reflect_on_summary"
 
 
 # Add nodes and edges
@@ -167,23 +468,39 @@ builder = StateGraph(SummaryState, input=SummaryStateInput, output=SummaryStateO
 builder.add_node("generate_query", generate_query)
 builder.add_node("web_research", web_research)
 builder.add_node("summarize_sources", summarize_sources)
+builder.add_node("research_query", research_query)
+builder.add_node("deduplicate_sources", deduplicate_sources)
+builder.add_node("summarize_query", summarize_query)
+builder.add_node("merge_summaries", merge_summaries)
 builder.add_node("reflect_on_summary", reflect_on_summary)
 builder.add_node("finalize_summary", finalize_summary)
 
 # Add edges
 builder.add_edge(START, "generate_query")
-builder.add_edge("generate_query", "web_research")
+builder.add_conditional_edges("generate_query", dispatch_research, ["web_research", "research_query"])
 builder.add_edge("web_research", "summarize_sources")
-builder.add_edge("summarize_sources", "reflect_on_summary")
-builder.add_conditional_edges("reflect_on_summary", route_research)
+builder.add_conditional_edges("summarize_sources", route_research)
+builder.add_edge("research_query", "deduplicate_sources")
+builder.add_conditional_edges("deduplicate_sources", dispatch_summaries, ["summarize_query", "merge_summaries"])
+builder.add_edge("summarize_query", "merge_summaries")
+builder.add_conditional_edges("merge_summaries", route_research)
+builder.add_conditional_edges("reflect_on_summary", dispatch_research, ["web_research", "research_query"])
 builder.add_edge("finalize_summary", END)
 
 graph = builder.compile()
 
 draw_graph_png("deep_research_agent.png", graph)
-stream = graph.stream({"research_topic": "kubernetes"})
-for s in stream:
-    for agent, e in s.items():
-        print("===========================")
-        print(agent, e, flush=True)
-        print("===========================")
+recorder = get_recorder()
+recorder.enabled = True
+events = stream_graph(
+    graph, {"research_topic": "kubernetes"}, token_nodes=["summarize_sources", "merge_summaries"], recorder=recorder
+)
+for event in events:
+    print_stream_event(event)
+
+if llm_cache:
+    print("llm cache", llm_cache.stats())
+if search_cache:
+    print("search cache", search_cache.stats())
+print(recorder.format_summary())
+recorder.export("deep_researcher")
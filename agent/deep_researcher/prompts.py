@@ -26,27 +26,29 @@ Provide your response in JSON format:"""
 summarizer_instructions="""
 <GOAL>
 Generate a high-quality summary of the web search results and keep it concise / related to the user topic.
+The summary is organized in sections, each starting with a "### " heading line naming its subject.
 </GOAL>
 
 <REQUIREMENTS>
 When creating a NEW summary:
 1. Highlight the most relevant information related to the user topic from the search results
-2. Ensure a coherent flow of information
-
-When EXTENDING an existing summary:                                                                                                                 
-1. Read the existing summary and new search results carefully.                                                    
-2. Compare the new information with the existing summary.                                                         
-3. For each piece of new information:                                                                             
-    a. If it's related to existing points, integrate it into the relevant paragraph.                               
-    b. If it's entirely new but relevant, add a new paragraph with a smooth transition.                            
-    c. If it's not relevant to the user topic, skip it.                                                            
-4. Ensure all additions are relevant to the user's topic.                                                         
-5. Verify that your final output differs from the input summary.                                                                                                                                                            
-< /REQUIREMENTS >
-
-< FORMATTING >
-- Start directly with the updated summary, without preamble or titles. Do not use XML tags in the output.  
-< /FORMATTING >"""
+2. Group the information into a few sections with short, descriptive titles
+
+When EXTENDING an existing summary:
+1. Read the existing summary and new search results carefully.
+2. Compare the new information with the existing sections.
+3. For each piece of new information:
+    a. If it's related to an existing section, write that section again with the information integrated.
+    b. If it's entirely new but relevant, write a new section with a new title.
+    c. If it's not relevant to the user topic, skip it.
+4. Write ONLY the new and updated sections. Sections you don't change are kept as they are, do not repeat them.
+5. Keep the exact title of a section you update. Sections shown as "(content omitted)" only need the new information.
+6. If the search results add nothing relevant, write nothing.
+</REQUIREMENTS>
+
+<FORMATTING>
+- Start directly with the first "### " heading, without preamble. Do not use XML tags in the output.
+</FORMATTING>"""
 
 reflection_instructions = """You are an expert research assistant analyzing a summary about {research_topic}.
 
@@ -74,4 +76,60 @@ Example output:
 }}
 </EXAMPLE>
 
-Provide your analysis in JSON format:"""
\ No newline at end of file
+Provide your analysis in JSON format:"""
+
+multi_query_writer_instructions = """Your goal is to generate {number_of_queries} diverse, targeted web search queries.
+Together the queries will gather information related to a specific topic, each one covering a different aspect.
+
+<TOPIC>
+{research_topic}
+</TOPIC>
+
+<FORMAT>
+Format your response as a JSON object with a single key "queries", a list of {number_of_queries} objects with these exact keys:
+   - "query": The actual search query string
+   - "aspect": The specific aspect of the topic being researched
+</FORMAT>
+
+<EXAMPLE>
+Example output:
+{{
+    "queries": [
+        {{"query": "machine learning transformer architecture explained", "aspect": "technical architecture"}},
+        {{"query": "transformer model inference latency benchmarks", "aspect": "performance"}}
+    ]
+}}
+</EXAMPLE>
+
+Provide your response in JSON format:"""
+
+multi_reflection_instructions = """You are an expert research assistant analyzing a summary about {research_topic}.
+
+<GOAL>
+1. Identify up to {number_of_queries} distinct knowledge gaps or areas that need deeper exploration
+2. Generate a follow-up question for each gap that would help expand your understanding
+3. Focus on technical details, implementation specifics, or emerging trends that weren't fully covered
+</GOAL>
+
+<REQUIREMENTS>
+Ensure every follow-up question is self-contained, includes necessary context for web search and doesn't overlap with the others.
+</REQUIREMENTS>
+
+<FORMAT>
+Format your response as a JSON object with these exact keys:
+- knowledge_gaps: Describe what information is missing or needs clarification
+- follow_up_queries: A list of specific questions addressing these gaps
+</FORMAT>
+
+<EXAMPLE>
+Example output:
+{{
+    "knowledge_gaps": "The summary lacks performance benchmarks and deployment practices",
+    "follow_up_queries": [
+        "What are typical performance benchmarks and metrics used to evaluate [specific technology]?",
+        "How is [specific technology] deployed and operated in production?"
+    ]
+}}
+</EXAMPLE>
+
+Provide your analysis in JSON format:"""
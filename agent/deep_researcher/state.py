@@ -7,10 +7,30 @@ from typing_extensions import TypedDict, Annotated
 class SummaryState:
     research_topic: str = field(default=None)  # Report topic
     search_query: str = field(default=None)  # Search query
+    search_queries: list = field(default_factory=list)  # Queries researched in parallel when num_queries > 1
     web_research_results: Annotated[list, operator.add] = field(default_factory=list)
     sources_gathered: Annotated[list, operator.add] = field(default_factory=list)
     research_loop_count: int = field(default=0)  # Research loop count
     running_summary: str = field(default=None)  # Final report
+    summary_sections: dict = field(default_factory=dict)  # Title -> content, running_summary is rendered from them
+    reasoning_stats: Annotated[list, operator.add] = field(default_factory=list)  # Reasoning/answer tokens per call
+    query_results: Annotated[list, operator.add] = field(default_factory=list)  # Per-query search results of each loop
+    query_sources: Annotated[list, operator.add] = field(default_factory=list)  # Per-query new sources of each loop
+    query_summaries: Annotated[list, operator.add] = field(default_factory=list)  # Per-query summaries of each loop
+    source_signatures: Annotated[list, operator.add] = field(default_factory=list)  # Canonical URL, MinHash per source
+    skipped_sources: Annotated[int, operator.add] = field(default=0)  # Near-duplicate sources dropped
+    # Prompt tokens the dropped sources would have taken
+    skipped_tokens: Annotated[int, operator.add] = field(default=0)
+    # Share of new content in each summary update, research stops early once it stays low
+    information_gains: Annotated[list, operator.add] = field(default_factory=list)
+
+
+@dataclass(kw_only=True)
+class QueryState:
+    research_topic: str = field(default=None)
+    search_query: str = field(default=None)
+    research_loop_count: int = field(default=0)  # Loop the query belongs to, the join nodes pick up its results
+    search_str: str = field(default=None)  # Prompt-ready new sources of the query, set for summarize_query
 
 
 @dataclass(kw_only=True)
@@ -21,3 +41,6 @@ class SummaryStateInput:
 @dataclass(kw_only=True)
 class SummaryStateOutput:
     running_summary: str = field(default=None)  # Final report
+    skipped_sources: int = field(default=0)
+    skipped_tokens: int = field(default=0)
+    information_gains: list = field(default_factory=list)
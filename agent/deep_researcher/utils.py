@@ -1,19 +1,22 @@
-import os
+from agent.shared.local_search import get_local_search_backend
+from agent.shared.near_duplicates import canonicalize_url
+from agent.shared.search import search
+from agent.shared.tokens import get_token_counter
 
-from langsmith import traceable
-from tavily import TavilyClient
 
-
-def deduplicate_and_format_sources(search_response, max_tokens_per_source, include_raw_content=False):
+def deduplicate_and_format_sources(
+    search_response, max_tokens_per_source, include_raw_content=False, token_counter=None
+):
     """
     Takes either a single search response or list of responses from search APIs and formats them.
-    Limits the raw_content to approximately max_tokens_per_source.
+    Limits the raw_content to max_tokens_per_source tokens.
     include_raw_content specifies whether to include the raw_content from Tavily in the formatted string.
 
     Args:
         search_response: Either:
             - A dict with a 'results' key containing a list of search results
             - A list of dicts, each containing search results
+        token_counter: TokenCounter of the model the sources are for, the uncalibrated estimate when None
 
     Returns:
         str: Formatted string with deduplicated sources
@@ -31,28 +34,27 @@ def deduplicate_and_format_sources(search_response, max_tokens_per_source, inclu
     else:
         raise ValueError("Input must be either a dict with 'results' or a list of search results")
 
-    # Deduplicate by URL
+    # Deduplicate by canonical URL, tracking parameters and mirrors of the scheme or www. don't make a new source
     unique_sources = {}
     for source in sources_list:
-        if source['url'] not in unique_sources:
-            unique_sources[source['url']] = source
+        url = canonicalize_url(source['url'])
+        if url not in unique_sources:
+            unique_sources[url] = source
 
     # Format output
+    token_counter = token_counter or get_token_counter("")
     formatted_text = "Sources:\n\n"
     for i, source in enumerate(unique_sources.values(), 1):
         formatted_text += f"Source {source['title']}:\n===\n"
         formatted_text += f"URL: {source['url']}\n===\n"
         formatted_text += f"Most relevant content from source: {source['content']}\n===\n"
         if include_raw_content:
-            # Using rough estimate of 4 characters per token
-            char_limit = max_tokens_per_source * 4
             # Handle None raw_content
             raw_content = source.get('raw_content', '')
             if raw_content is None:
                 raw_content = ''
                 print(f"Warning: No raw_content found for source {source['url']}")
-            if len(raw_content) > char_limit:
-                raw_content = raw_content[:char_limit] + "... [truncated]"
+            raw_content = token_counter.truncate(raw_content, max_tokens_per_source)
             formatted_text += f"Full source content limited to {max_tokens_per_source} tokens: {raw_content}\n\n"
 
     return formatted_text.strip()
@@ -70,14 +72,14 @@ def format_sources(search_results):
     return '\n'.join(f"* {source['title']} : {source['url']}" for source in search_results['results'])
 
 
-@traceable
-def tavily_search(query, include_raw_content=True, max_results=3):
-    """Search the web using the Tavily API.
+def tavily_search(query, include_raw_content=True, max_results=3, cache=None):
+    """Search the web using the Tavily API, or the backend set with `set_search_backend`.
 
     Args:
         query (str): The search query to execute
         include_raw_content (bool): Whether to include the raw_content from Tavily in the formatted string
         max_results (int): Maximum number of results to return
+        cache (SearchResultCache): Serves repeated searches of the query and params when given
 
     Returns:
         dict: Search response containing:
@@ -87,8 +89,24 @@ def tavily_search(query, include_raw_content=True, max_results=3):
                 - content (str): Snippet/summary of the content
                 - raw_content (str): Full content of the page if available"""
 
-    api_key = os.getenv("TAVILY_API_KEY")
-    if not api_key:
-        raise ValueError("TAVILY_API_KEY environment variable is not set")
-    tavily_client = TavilyClient(api_key=api_key)
-    return tavily_client.search(query, max_results=max_results, include_raw_content=include_raw_content)
+    return search(query, max_results=max_results, include_raw_content=include_raw_content, cache=cache)
+
+
+def local_search(query, directory, include_raw_content=True, max_results=3):
+    """Search the documents of a local directory with a BM25 index, no network needed.
+
+    Args:
+        query (str): The search query to execute
+        directory (str): Directory of Markdown, text, HTML and PDF documents, indexed on first use
+        include_raw_content (bool): Whether to include the full document text
+        max_results (int): Maximum number of results to return
+
+    Returns:
+        dict: Search response in the same shape as tavily_search, urls are file:// urls"""
+
+    return search(
+        query,
+        max_results=max_results,
+        include_raw_content=include_raw_content,
+        backend=get_local_search_backend(directory),
+    )
@@ -0,0 +1,190 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from agent.shared.instrumentation import Span, get_recorder, payload_size
+from agent.shared.response_formats import APIPlanResponse
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+class APIRequestExecutor:
+    """Executes `APIPlanResponse` plans over a shared, pooled `requests.Session`.
+
+    Args:
+        pool_size: Connections kept alive per host.
+        timeout: Per-attempt connect/read timeout in seconds.
+        total_timeout: Budget in seconds for a plan including every retry and backoff.
+        max_retries: Retries for idempotent methods on connection errors, timeouts and `RETRY_STATUS_CODES`.
+        backoff_factor: First backoff in seconds, doubled on every retry.
+        max_backoff: Upper bound of a single backoff in seconds.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 32,
+        timeout: float = 10.0,
+        total_timeout: float = 30.0,
+        max_retries: int = 2,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 4.0,
+    ):
+        self.timeout = timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(
+        self,
+        server: str,
+        plan: APIPlanResponse,
+        token: Optional[str],
+        validator: Optional[Callable[[Any, int], list[str]]] = None,
+    ) -> Dict[str, Any]:
+        """Execute a plan, a successful response body is checked with `validator(body, status_code)` when given."""
+        result = self._request(server, plan, token, validator)
+        recorder = get_recorder()
+        if recorder.enabled:
+            recorder.record(
+                Span(
+                    kind="http",
+                    name=f"{result['method']} {plan.endpoint}",
+                    wall_ms=result["elapsed_ms"],
+                    queue_ms=result["backoff_ms"],
+                    request_bytes=payload_size(plan.payload),
+                    response_bytes=result["response_size"],
+                    error=result.get("error") or (None if result["is_success"] else f"HTTP {result['status_code']}"),
+                )
+            )
+        return result
+
+    def _request(
+        self,
+        server: str,
+        plan: APIPlanResponse,
+        token: Optional[str],
+        validator: Optional[Callable[[Any, int], list[str]]],
+    ) -> Dict[str, Any]:
+        method = plan.method.upper()
+        retryable = method in IDEMPOTENT_METHODS
+        started_at = time.monotonic()
+        deadline = started_at + self.total_timeout
+        attempts = 0
+        backoff_ms = 0.0
+
+        while True:
+            attempts += 1
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise requests.Timeout(f"Total timeout of {self.total_timeout}s exceeded")
+                response = self.session.request(
+                    method=method,
+                    url=server + plan.endpoint,
+                    params=plan.query_params,
+                    json=plan.payload,
+                    headers={"Authorization": f"Bearer {token}"} if token else {},
+                    timeout=min(self.timeout, remaining),
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if retryable and (delay := self._backoff(attempts, deadline)) is not None:
+                    backoff_ms += delay * 1000
+                    continue
+                return self._error_result(plan, e, started_at, attempts, backoff_ms)
+            except Exception as e:
+                return self._error_result(plan, e, started_at, attempts, backoff_ms)
+
+            if (
+                response.status_code in RETRY_STATUS_CODES
+                and retryable
+                and (delay := self._backoff(attempts, deadline)) is not None
+            ):
+                backoff_ms += delay * 1000
+                continue
+            body = self._parse_body(response)
+            validation_errors = validator(body, response.status_code) if validator and response.ok else []
+            return {
+                "endpoint": plan.endpoint,
+                "method": method,
+                "is_success": response.ok and not validation_errors,
+                "status_code": response.status_code,
+                "body": body,
+                "validation_errors": validation_errors,
+                "elapsed_ms": round((time.monotonic() - started_at) * 1000, 2),
+                "response_size": len(response.content),
+                "attempts": attempts,
+                "backoff_ms": round(backoff_ms, 2),
+            }
+
+    async def arequest(
+        self,
+        server: str,
+        plan: APIPlanResponse,
+        token: Optional[str],
+        validator: Optional[Callable[[Any, int], list[str]]] = None,
+    ) -> Dict[str, Any]:
+        """Thread-offload wrapper around `request` for async callers, not a native async client.
+
+        Every call blocks a thread of the default executor for its whole duration, so concurrency is bounded by that
+        thread pool (and by `pool_size` connections per host), not by the event loop.
+        """
+        return await asyncio.to_thread(self.request, server, plan, token, validator)
+
+    def close(self):
+        self.session.close()
+
+    def _backoff(self, attempts: int, deadline: float) -> Optional[float]:
+        """Sleep before the next retry and return the delay, None when no retry is left within the deadline."""
+        if attempts > self.max_retries:
+            return None
+        delay = min(self.backoff_factor * 2 ** (attempts - 1), self.max_backoff)
+        if time.monotonic() + delay >= deadline:
+            return None
+        time.sleep(delay)
+        return delay
+
+    @staticmethod
+    def _parse_body(response: requests.Response) -> Any:
+        if "application/json" in response.headers.get("Content-Type", ""):
+            try:
+                return response.json()
+            except ValueError:
+                pass
+        return response.text
+
+    @staticmethod
+    def _error_result(
+        plan: APIPlanResponse, error: Exception, started_at: float, attempts: int, backoff_ms: float
+    ) -> Dict[str, Any]:
+        return {
+            "endpoint": plan.endpoint,
+            "method": plan.method.upper(),
+            "is_success": False,
+            "status_code": None,
+            "error": str(error),
+            "validation_errors": [],
+            "elapsed_ms": round((time.monotonic() - started_at) * 1000, 2),
+            "response_size": 0,
+            "attempts": attempts,
+            "backoff_ms": round(backoff_ms, 2),
+        }
+
+
+_default_executor: Optional[APIRequestExecutor] = None
+
+
+def get_default_executor() -> APIRequestExecutor:
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = APIRequestExecutor()
+    return _default_executor
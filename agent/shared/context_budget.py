@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from agent.shared.tokens import TokenCounter
+
+
+@dataclass(kw_only=True)
+class ContextBudget:
+    """Splits a model's context window between the fixed prompt parts, the running summary and new sources.
+
+    Args:
+        context_window: Tokens the model is run with, pass the same value as Ollama's `num_ctx`.
+        reserved_output: Tokens kept free for the answer, including any reasoning.
+        summary_share: Part of the remaining tokens the existing summary may use while sources compete for them,
+            sources that need less give their share back to the summary.
+    """
+
+    context_window: int
+    reserved_output: int
+    summary_share: float = 0.4
+
+    def allocate(
+        self,
+        counter: TokenCounter,
+        fixed: list[str],
+        summary: Optional[str],
+        sources: list[str],
+    ) -> tuple[Optional[str], list[str]]:
+        """Truncate `summary` and `sources` so that they fit next to `fixed` (instructions, topic, markup).
+
+        Sources share their tokens evenly, so one long page can't crowd out the others.
+        """
+        available = self.context_window - self.reserved_output - sum(counter.count(text) for text in fixed)
+        available = max(available, 0)
+        summary_tokens = counter.count(summary)
+        source_tokens = [counter.count(source) for source in sources]
+
+        summary_limit = min(summary_tokens, int(available * self.summary_share) if sources else available)
+        source_limits = self._fair_shares(source_tokens, available - summary_limit)
+        summary_limit = min(summary_tokens, available - sum(source_limits))
+
+        if summary is not None and summary_limit < summary_tokens:
+            summary = counter.truncate(summary, summary_limit)
+        sources = [
+            counter.truncate(source, limit) if limit < tokens else source
+            for source, tokens, limit in zip(sources, source_tokens, source_limits)
+        ]
+        return summary, sources
+
+    @staticmethod
+    def _fair_shares(sizes: list[int], budget: int) -> list[int]:
+        """Water-filling: sources smaller than an even share keep their size, the rest split what's left."""
+        limits = [0] * len(sizes)
+        remaining = max(budget, 0)
+        pending = sorted(range(len(sizes)), key=lambda index: sizes[index])
+        while pending:
+            share = remaining // len(pending)
+            index = pending.pop(0)
+            limits[index] = min(sizes[index], share)
+            remaining -= limits[index]
+        return limits
@@ -0,0 +1,179 @@
+from typing import Any, Callable, Optional
+
+MAX_VALIDATION_ERRORS = 10
+
+Check = Callable[[Any, str, list], None]
+Validator = Callable[[Any], list[str]]
+# Validates a response body against the schema of its status code
+ResponseValidator = Callable[[Any, int], list[str]]
+
+JSON_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+}
+
+
+def _type_name(value: Any) -> str:
+    return "null" if value is None else type(value).__name__
+
+
+def _compile(schema: Any) -> Check:
+    """Compile a (dereferenced) JSON schema into a tree of closures, so validating a value does no schema lookups."""
+    if not isinstance(schema, dict) or not schema:
+        return lambda value, path, errors: None
+
+    checks: list[Check] = []
+    nullable = schema.get("nullable", False)
+
+    # OpenAPI 3.1 lists the types of a union, e.g. ["string", "null"] for a nullable string
+    schema_type = schema.get("type")
+    type_names = [schema_type] if isinstance(schema_type, str) else schema_type if isinstance(schema_type, list) else []
+    if "null" in type_names:
+        nullable = True
+    known_types = [name for name in type_names if name in JSON_TYPES]
+    if known_types:
+        expected = tuple(python_type for name in known_types for python_type in JSON_TYPES[name])
+        # bool is an int subclass, it's only a valid number when the schema also allows booleans
+        exclude_bool = "boolean" not in known_types and ("integer" in known_types or "number" in known_types)
+        expected_names = "|".join(known_types)
+
+        def check_type(value, path, errors):
+            if not isinstance(value, expected) or (exclude_bool and isinstance(value, bool)):
+                errors.append(f"{path}: expected {expected_names}, got {_type_name(value)}")
+
+        checks.append(check_type)
+
+    if schema.get("enum"):
+        allowed = list(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed}")
+
+        checks.append(check_enum)
+
+    if schema.get("properties") or schema.get("required"):
+        required = list(schema.get("required") or [])
+        properties = [(name, _compile(value)) for name, value in (schema.get("properties") or {}).items()]
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: missing required property '{name}'")
+            for name, check in properties:
+                if name in value:
+                    check(value[name], f"{path}.{name}", errors)
+
+        checks.append(check_object)
+
+    if isinstance(schema.get("items"), dict):
+        check_item = _compile(schema["items"])
+
+        def check_items(value, path, errors):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    check_item(item, f"{path}[{index}]", errors)
+                    if len(errors) >= MAX_VALIDATION_ERRORS:
+                        return
+
+        checks.append(check_items)
+
+    if schema.get("anyOf"):
+        any_options = [_compile(option) for option in schema["anyOf"]]
+
+        def check_any(value, path, errors):
+            for option in any_options:
+                option_errors = []
+                option(value, path, option_errors)
+                if not option_errors:
+                    return
+            errors.append(f"{path}: does not match any schema of anyOf")
+
+        checks.append(check_any)
+
+    if schema.get("oneOf"):
+        one_options = [_compile(option) for option in schema["oneOf"]]
+
+        def check_one(value, path, errors):
+            matches = 0
+            for option in one_options:
+                option_errors = []
+                option(value, path, option_errors)
+                matches += not option_errors
+            if matches != 1:
+                errors.append(f"{path}: matches {matches} schemas of oneOf, expected exactly one")
+
+        checks.append(check_one)
+
+    for part in schema.get("allOf") or []:
+        checks.append(_compile(part))
+
+    def check(value, path, errors):
+        if value is None and nullable:
+            return
+        for each in checks:
+            each(value, path, errors)
+
+    return check
+
+
+def compile_schema(schema: dict) -> Validator:
+    check = _compile(schema)
+
+    def validate(value: Any) -> list[str]:
+        errors = []
+        check(value, "$", errors)
+        return errors[:MAX_VALIDATION_ERRORS]
+
+    return validate
+
+
+def response_schema(endpoint: tuple[str, str, dict]) -> Optional[dict]:
+    """JSON schema of the 200 response kept by the reduced spec, None when the endpoint doesn't declare one."""
+    content = (endpoint[2].get("responses") or {}).get("content") or {}
+    for content_type, media in content.items():
+        if "json" in content_type and isinstance(media, dict) and media.get("schema"):
+            return media["schema"]
+    return None
+
+
+def response_schemas(endpoint: tuple[str, str, dict]) -> dict[int, dict]:
+    """JSON schemas of an endpoint's responses by status code, the reduced spec only keeps the 200 response."""
+    schema = response_schema(endpoint)
+    return {200: schema} if schema else {}
+
+
+def compile_response_validator(schemas: dict[int, dict]) -> Optional[ResponseValidator]:
+    """Validator of response bodies by status code, bodies of codes without a schema (201, 204, ...) pass."""
+    validators = {int(status_code): compile_schema(schema) for status_code, schema in schemas.items() if schema}
+    if not validators:
+        return None
+
+    def validate(value: Any, status_code: int) -> list[str]:
+        validator = validators.get(status_code)
+        return validator(value) if validator else []
+
+    return validate
+
+
+MAX_RESPONSE_VALIDATORS = 1024
+# id of the endpoint's docs -> (docs, validator), the docs are kept so their id isn't reused while cached
+_validators: dict[int, tuple[dict, Optional[ResponseValidator]]] = {}
+
+
+def get_response_validator(endpoint: tuple[str, str, dict]) -> Optional[ResponseValidator]:
+    """Compiled response validator of an endpoint, compiled once per endpoint of a loaded spec."""
+    docs = endpoint[2]
+    entry = _validators.pop(id(docs), None)
+    if entry is None or entry[0] is not docs:
+        entry = (docs, compile_response_validator(response_schemas(endpoint)))
+    _validators[id(docs)] = entry
+    while len(_validators) > MAX_RESPONSE_VALIDATORS:
+        del _validators[next(iter(_validators))]
+    return entry[1]
@@ -0,0 +1,82 @@
+from typing import Any
+
+from agent.shared.scheduler import (
+    infer_consumed_ids,
+    is_id_field,
+    normalize_id_key,
+    split_endpoint_name,
+    PATH_PARAMETER_PATTERN,
+)
+
+MAX_IDS_PER_KEY = 5
+
+# Envelope keys that don't name a resource, an `id` below them belongs to the endpoint's own resource.
+ENVELOPE_KEYS = frozenset({"data", "result", "results", "items", "content", "list", "body", "payload", "response"})
+
+
+def extract_ids(endpoint: str, body: Any, max_depth: int = 6) -> dict[str, list[dict]]:
+    """Index the ID values of a response body by normalized ID key, e.g. `{"bannerid": [{"value": 3, ...}]}`.
+
+    Args:
+        endpoint: Endpoint name like `POST /banners`, its last static segment names top-level `id` fields.
+        body: Parsed response body.
+    """
+    _, segments = split_endpoint_name(endpoint)
+    static_segments = [segment for segment in segments if not PATH_PARAMETER_PATTERN.match(segment)]
+    index = {}
+
+    def visit(value: Any, resource: str, path: str, depth: int):
+        if depth > max_depth:
+            return
+        if isinstance(value, dict):
+            for key, child in value.items():
+                child_path = f"{path}.{key}" if path else key
+                if is_id_field(key) and isinstance(child, (str, int)) and not isinstance(child, bool):
+                    index.setdefault(normalize_id_key(key, resource), []).append(
+                        {"value": child, "source": f"{endpoint} {child_path}"}
+                    )
+                elif isinstance(child, (dict, list)):
+                    child_resource = resource if key.lower() in ENVELOPE_KEYS else key
+                    visit(child, child_resource, child_path, depth + 1)
+        elif isinstance(value, list):
+            for child in value[:MAX_IDS_PER_KEY]:
+                visit(child, resource, f"{path}[]", depth + 1)
+
+    visit(body, static_segments[-1] if static_segments else None, "", 0)
+    return merge_id_index({}, index)
+
+
+def merge_id_index(left: dict[str, list[dict]], right: dict[str, list[dict]]) -> dict[str, list[dict]]:
+    """Reducer for the ID index channel, keeps the `MAX_IDS_PER_KEY` most recent distinct values per key."""
+    merged = dict(left or {})
+    for key, entries in (right or {}).items():
+        by_value = {entry["value"]: entry for entry in merged.get(key, [])}
+        for entry in entries:
+            by_value.pop(entry["value"], None)
+            by_value[entry["value"]] = entry
+        merged[key] = list(by_value.values())[-MAX_IDS_PER_KEY:]
+    return merged
+
+
+def select_candidate_ids(id_index: dict[str, list[dict]], endpoint: tuple[str, str, dict]) -> dict[str, list[dict]]:
+    """Pick the indexed IDs matching the path, query and body ID parameters of a `ReducedOpenAPISpec` endpoint.
+
+    Keys the endpoint needs but the index doesn't have yet map to an empty list.
+    """
+    name, _, docs = endpoint
+    wanted = infer_consumed_ids(name, docs)
+    for parameter in docs.get("parameters") or []:
+        if is_id_field(parameter.get("name", "")) and parameter.get("in") != "path":
+            wanted.add(normalize_id_key(parameter["name"]))
+    return {key: id_index.get(key, []) for key in sorted(wanted)}
+
+
+def format_candidate_ids(candidate_ids: dict[str, list[dict]]) -> str:
+    lines = []
+    for key, entries in candidate_ids.items():
+        if entries:
+            values = ", ".join(f"{entry['value']!r} (from {entry['source']})" for entry in entries)
+            lines.append(f"- {key}: {values}")
+        else:
+            lines.append(f"- {key}: no previous successful response provides this ID")
+    return "\n".join(lines)
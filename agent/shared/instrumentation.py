@@ -0,0 +1,322 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from typing import Any, Iterator, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+DEFAULT_METRICS_DIR = os.environ.get("METRICS_DIR", ".metrics")
+# Run metadata key of the milliseconds a call waited before its runnable started, e.g. in the ModelScheduler
+QUEUE_WAIT_METADATA_KEY = "queue_wait_ms"
+
+
+def percentile(sorted_values: list[float], ratio: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(ratio * len(sorted_values)) - 1))]
+
+
+def payload_size(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode())
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+
+@dataclass(kw_only=True)
+class Span:
+    """One measured unit of work.
+
+    Args:
+        kind: `graph`, `node`, `llm`, `search` or `http`.
+        name: Node name, model, search backend or request endpoint.
+        wall_ms: Time from start to end as seen by the caller.
+        queue_ms: Time spent waiting instead of working, e.g. queued in the ModelScheduler or Ollama or backing off
+            between retries.
+        ttft_ms: Time to the first streamed LLM token.
+    """
+
+    kind: str
+    name: str
+    started_at: float = field(default_factory=time.time)
+    wall_ms: float = 0.0
+    queue_ms: Optional[float] = None
+    ttft_ms: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    tokens_per_sec: Optional[float] = None
+    request_bytes: Optional[int] = None
+    response_bytes: Optional[int] = None
+    error: Optional[str] = None
+
+
+class Recorder:
+    """Collects spans in memory and exports them locally as JSONL and Prometheus text, no tracing service needed.
+
+    Recording is off until `enabled` is set, so library code can record unconditionally.
+    """
+
+    def __init__(self, max_spans: int = 100_000):
+        self.enabled = False
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def record(self, span: Span):
+        if self.enabled:
+            with self._lock:
+                self._spans.append(span)
+
+    @contextmanager
+    def span(self, kind: str, name: str, **fields: Any) -> Iterator[Span]:
+        """Measure the wall time of the block, the yielded span takes any other field the block knows."""
+        span = Span(kind=kind, name=name, **fields)
+        started_at = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.wall_ms = round((time.perf_counter() - started_at) * 1000, 2)
+            self.record(span)
+
+    def spans(self, kind: Optional[str] = None) -> list[Span]:
+        with self._lock:
+            return [span for span in self._spans if kind is None or span.kind == kind]
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+
+    def callback_handler(self) -> "InstrumentationCallbackHandler":
+        return InstrumentationCallbackHandler(self)
+
+    def to_jsonl(self) -> str:
+        return "".join(json.dumps(asdict(span), ensure_ascii=False) + "\n" for span in self.spans())
+
+    def to_prometheus(self) -> str:
+        groups: dict[tuple[str, str], list[Span]] = {}
+        for span in self.spans():
+            groups.setdefault((span.kind, span.name), []).append(span)
+
+        metrics = {
+            "agent_span_total": ("counter", "Measured spans.", lambda spans: len(spans)),
+            "agent_span_errors_total": (
+                "counter",
+                "Spans that failed.",
+                lambda spans: sum(1 for s in spans if s.error),
+            ),
+            "agent_span_duration_seconds_sum": (
+                "counter",
+                "Wall time of spans.",
+                lambda spans: sum(s.wall_ms for s in spans) / 1000,
+            ),
+            "agent_span_duration_seconds_max": (
+                "gauge",
+                "Slowest span.",
+                lambda spans: max(s.wall_ms for s in spans) / 1000,
+            ),
+            "agent_span_queue_seconds_sum": (
+                "counter",
+                "Time spans spent queued or backing off.",
+                lambda spans: sum(s.queue_ms or 0 for s in spans) / 1000,
+            ),
+            "agent_prompt_tokens_total": (
+                "counter",
+                "LLM prompt tokens.",
+                lambda spans: sum(s.prompt_tokens or 0 for s in spans),
+            ),
+            "agent_completion_tokens_total": (
+                "counter",
+                "LLM completion tokens.",
+                lambda spans: sum(s.completion_tokens or 0 for s in spans),
+            ),
+            "agent_request_bytes_total": (
+                "counter",
+                "Request payload bytes.",
+                lambda spans: sum(s.request_bytes or 0 for s in spans),
+            ),
+            "agent_response_bytes_total": (
+                "counter",
+                "Response payload bytes.",
+                lambda spans: sum(s.response_bytes or 0 for s in spans),
+            ),
+        }
+        lines = []
+        for metric, (metric_type, help_text, value) in metrics.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for (kind, name), spans in sorted(groups.items()):
+                lines.append(f'{metric}{{kind="{kind}",name="{escape_label(name)}"}} {value(spans):g}')
+
+        lines.append("# HELP agent_tokens_per_second Average LLM generation throughput.")
+        lines.append("# TYPE agent_tokens_per_second gauge")
+        for (kind, name), spans in sorted(groups.items()):
+            throughputs = [s.tokens_per_sec for s in spans if s.tokens_per_sec]
+            if throughputs:
+                lines.append(
+                    f'agent_tokens_per_second{{kind="{kind}",name="{escape_label(name)}"}} '
+                    f"{sum(throughputs) / len(throughputs):g}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def export(self, run_name: str, directory: str = DEFAULT_METRICS_DIR) -> tuple[str, str]:
+        """Write `<run_name>.jsonl` (appended) and `<run_name>.prom` (replaced) into `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        jsonl_path = os.path.join(directory, f"{run_name}.jsonl")
+        prometheus_path = os.path.join(directory, f"{run_name}.prom")
+        with open(jsonl_path, "a") as f:
+            f.write(self.to_jsonl())
+        with open(prometheus_path, "w") as f:
+            f.write(self.to_prometheus())
+        return jsonl_path, prometheus_path
+
+    def format_summary(self, top: int = 10) -> str:
+        """Slowest nodes by total wall time, followed by LLM throughput per model."""
+        nodes: dict[str, list[float]] = {}
+        for span in self.spans("node"):
+            nodes.setdefault(span.name, []).append(span.wall_ms)
+        lines = [f"{'node':<32}{'calls':>7}{'total':>12}{'avg':>10}{'p95':>10}{'max':>10}"]
+        for name, wall_ms in sorted(nodes.items(), key=lambda item: sum(item[1]), reverse=True)[:top]:
+            wall_ms.sort()
+            lines.append(
+                f"{name[:31]:<32}{len(wall_ms):>7}{sum(wall_ms):>10.0f}ms{sum(wall_ms) / len(wall_ms):>8.0f}ms"
+                f"{percentile(wall_ms, 0.95):>8.0f}ms{wall_ms[-1]:>8.0f}ms"
+            )
+
+        models: dict[str, list[Span]] = {}
+        for span in self.spans("llm"):
+            models.setdefault(span.name, []).append(span)
+        if models:
+            lines.append("")
+            lines.append(f"{'model':<32}{'calls':>7}{'prompt':>10}{'output':>10}{'tok/s':>10}{'queue':>10}")
+            for name, spans in sorted(models.items()):
+                throughputs = [s.tokens_per_sec for s in spans if s.tokens_per_sec]
+                lines.append(
+                    f"{name[:31]:<32}{len(spans):>7}{sum(s.prompt_tokens or 0 for s in spans):>10}"
+                    f"{sum(s.completion_tokens or 0 for s in spans):>10}"
+                    f"{(sum(throughputs) / len(throughputs) if throughputs else 0):>10.1f}"
+                    f"{sum(s.queue_ms or 0 for s in spans):>8.0f}ms"
+                )
+        return "\n".join(lines)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class InstrumentationCallbackHandler(BaseCallbackHandler):
+    """Records a span per LangGraph node run and per chat model call of the runs it's attached to."""
+
+    def __init__(self, recorder: Recorder):
+        self.recorder = recorder
+        self._runs: dict[UUID, tuple[Span, float]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, span: Span):
+        with self._lock:
+            self._runs[run_id] = (span, time.perf_counter())
+
+    def _end(self, run_id: UUID) -> Optional[Span]:
+        with self._lock:
+            entry = self._runs.pop(run_id, None)
+        if entry is None:
+            return None
+        span, started_at = entry
+        span.wall_ms = round((time.perf_counter() - started_at) * 1000, 2)
+        return span
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        node = (metadata or {}).get("langgraph_node")
+        # Runnables inside a node inherit its metadata, only the node's own run carries its name. Its input is the
+        # whole graph state, sizing it on every step would cost more the longer the run gets.
+        if node and kwargs.get("name") == node:
+            self._start(run_id, Span(kind="node", name=node))
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        if span := self._end(run_id):
+            # The node's state update, not the state it was given
+            span.response_bytes = payload_size(outputs)
+            self.recorder.record(span)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        if span := self._end(run_id):
+            span.error = repr(error)
+            self.recorder.record(span)
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[Any]],
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or (kwargs.get("invocation_params") or {}).get("model")
+        request_bytes = sum(payload_size(message.content) for batch in messages for message in batch)
+        # Callbacks only see the call once it runs, a wait before it is handed over in the run metadata
+        queue_ms = metadata.get(QUEUE_WAIT_METADATA_KEY)
+        self._start(run_id, Span(kind="llm", name=model or "unknown", request_bytes=request_bytes, queue_ms=queue_ms))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            entry = self._runs.get(run_id)
+        if entry and entry[0].ttft_ms is None:
+            entry[0].ttft_ms = round((time.perf_counter() - entry[1]) * 1000, 2)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        span = self._end(run_id)
+        if span is None:
+            return
+        queue_wait_ms = span.queue_ms or 0.0
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        if isinstance(generation, ChatGeneration):
+            message = generation.message
+            usage = message.usage_metadata or {}
+            span.prompt_tokens = usage.get("input_tokens")
+            span.completion_tokens = usage.get("output_tokens")
+            span.response_bytes = payload_size(message.content)
+
+            # Ollama reports its own durations in ns, the rest of the caller's wall time was spent queued or in transit
+            metadata = {**(generation.generation_info or {}), **(message.response_metadata or {})}
+            if metadata.get("total_duration"):
+                ollama_queue_ms = max(0.0, span.wall_ms - metadata["total_duration"] / 1e6)
+                span.queue_ms = round(queue_wait_ms + ollama_queue_ms, 2)
+            if metadata.get("eval_count") and metadata.get("eval_duration"):
+                span.tokens_per_sec = round(metadata["eval_count"] / (metadata["eval_duration"] / 1e9), 2)
+        if span.tokens_per_sec is None and span.completion_tokens and span.wall_ms:
+            span.tokens_per_sec = round(span.completion_tokens / (span.wall_ms / 1000), 2)
+        span.wall_ms = round(span.wall_ms + queue_wait_ms, 2)
+        self.recorder.record(span)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        if span := self._end(run_id):
+            span.error = repr(error)
+            self.recorder.record(span)
+
+
+_recorder = Recorder()
+
+
+def get_recorder() -> Recorder:
+    return _recorder
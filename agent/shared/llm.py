@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+from typing import Any, Optional, Type
+
+import ollama
+from langchain_core.runnables import Runnable
+from langchain_ollama import ChatOllama
+from pydantic import BaseModel
+
+from agent.shared.llm_cache import LLMResponseCache
+from agent.shared.model_scheduler import ModelScheduler
+
+# How long Ollama keeps a model loaded after a call, e.g. "30m", "-1" keeps it resident until the server stops
+DEFAULT_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+DEFAULT_OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL") or None
+
+_clients: dict[str, Runnable] = {}
+# Plain Ollama API clients per base_url for model loading and unloading, independent of ChatOllama's internals
+_ollama_clients: dict[Optional[str], ollama.Client] = {}
+_lock = threading.Lock()
+_model_scheduler: Optional[ModelScheduler] = None
+
+
+def _client_key(kind: str, base_url: Optional[str], model: str, params: dict) -> str:
+    return json.dumps([kind, base_url, model, params], sort_keys=True, default=repr)
+
+
+def _chat_ollama(model: str, base_url: Optional[str], **params: Any) -> ChatOllama:
+    key = _client_key("chat", base_url, model, params)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                cache = params.get("cache")
+                if isinstance(cache, LLMResponseCache):
+                    # ChatOllama's llm_string lacks the model and its params, they have to be part of the cache key
+                    llm_params = {name: value for name, value in params.items() if name not in ("cache", "keep_alive")}
+                    params = {**params, "cache": cache.bind(model=model, **llm_params)}
+                client = _clients[key] = ChatOllama(model=model, base_url=base_url, **params)
+    return client
+
+
+def _ollama_client(base_url: Optional[str]) -> ollama.Client:
+    client = _ollama_clients.get(base_url)
+    if client is None:
+        with _lock:
+            client = _ollama_clients.setdefault(base_url, ollama.Client(host=base_url))
+    return client
+
+
+def _scheduled(key: str, client: Runnable, model: str) -> Runnable:
+    scheduler = _model_scheduler
+    if scheduler is None:
+        return client
+    scheduled_key = f"scheduled:{id(scheduler)}:{key}"
+    scheduled_client = _clients.get(scheduled_key)
+    if scheduled_client is None:
+        with _lock:
+            scheduled_client = _clients.setdefault(scheduled_key, scheduler.wrap(client, model))
+    return scheduled_client
+
+
+def get_chat_ollama(
+    model: str,
+    temperature: Optional[float] = None,
+    base_url: Optional[str] = DEFAULT_OLLAMA_BASE_URL,
+    keep_alive: Optional[int | str] = DEFAULT_KEEP_ALIVE,
+    **kwargs: Any,
+) -> Runnable:
+    """Shared `ChatOllama` per base_url, model and params, so nodes reuse one client and its connection pool.
+
+    Calls go through the model scheduler when one is set with `set_model_scheduler`.
+
+    Args:
+        model: Ollama model name.
+        temperature: Sampling temperature.
+        base_url: Ollama server, `OLLAMA_BASE_URL` or the ollama default when None.
+        keep_alive: Sent with every call so the model stays loaded between calls.
+        kwargs: Any other `ChatOllama` field, e.g. `format="json"` or `cache=LLMResponseCache(...)`.
+    """
+    params = {"temperature": temperature, "keep_alive": keep_alive, **kwargs}
+    client = _chat_ollama(model, base_url, **params)
+    return _scheduled(_client_key("chat", base_url, model, params), client, model)
+
+
+def get_structured_chat_ollama(schema: Type[BaseModel], model: str, **kwargs: Any) -> Runnable:
+    """Shared `get_chat_ollama(model, **kwargs).with_structured_output(schema)`."""
+    base_url = kwargs.pop("base_url", DEFAULT_OLLAMA_BASE_URL)
+    params = {"temperature": None, "keep_alive": DEFAULT_KEEP_ALIVE, **kwargs}
+    key = _client_key("structured", base_url, model, {"schema": schema, **params})
+    client = _clients.get(key)
+    if client is None:
+        llm = _chat_ollama(model, base_url, **params)
+        with _lock:
+            client = _clients.setdefault(key, llm.with_structured_output(schema))
+    return _scheduled(key, client, model)
+
+
+def set_model_scheduler(scheduler: Optional[ModelScheduler]):
+    """Group the calls of concurrent runs by model through `scheduler`, None calls Ollama directly."""
+    global _model_scheduler
+    with _lock:
+        for key in [key for key in _clients if key.startswith("scheduled:")]:
+            del _clients[key]
+        _model_scheduler = scheduler
+
+
+def warm_up(
+    model: str,
+    base_url: Optional[str] = DEFAULT_OLLAMA_BASE_URL,
+    keep_alive: Optional[int | str] = DEFAULT_KEEP_ALIVE,
+):
+    """Load `model` into memory ahead of the first call, an empty generate request makes Ollama load it only."""
+    load = lambda: _ollama_client(base_url).generate(model=model, keep_alive=keep_alive)
+    if _model_scheduler:
+        _model_scheduler.run(model, load)
+    else:
+        load()
+
+
+def unload(model: str, base_url: Optional[str] = DEFAULT_OLLAMA_BASE_URL):
+    """Release `model` from Ollama's memory right away."""
+    _ollama_client(base_url).generate(model=model, keep_alive=0)
+
+
+def clear_llm_clients():
+    with _lock:
+        _clients.clear()
+        _ollama_clients.clear()
@@ -0,0 +1,104 @@
+import copy
+import hashlib
+import json
+import os
+from typing import Any, Iterator, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps, loads
+from langchain_core.messages import BaseMessageChunk, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, Generation
+from langchain_core.runnables import RunnableConfig
+
+from agent.shared.sqlite_cache import SQLiteCacheStore
+
+DEFAULT_LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+DEFAULT_LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 60 * 60))
+DEFAULT_LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+class LLMResponseCache(BaseCache):
+    """Exact-match LLM response cache in SQLite, pass it as `cache=` of a chat model to opt an agent in.
+
+    Entries are keyed by the serialized messages, the call's llm_string and the params given to `bind`. Some chat
+    models (ChatOllama) leave the model and temperature out of their llm_string, so a cache is bound to them per
+    model config, which `get_chat_ollama` does on its own. Entries live in a `SQLiteCacheStore`.
+
+    Args:
+        namespace: Usually the agent name.
+        path: SQLite file shared by every namespace.
+        ttl: Seconds an entry is served, None keeps entries until evicted by size.
+        max_bytes: Stored response bytes per namespace, least recently used entries are evicted beyond it.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: str = DEFAULT_LLM_CACHE_PATH,
+        ttl: Optional[float] = DEFAULT_LLM_CACHE_TTL,
+        max_bytes: int = DEFAULT_LLM_CACHE_MAX_BYTES,
+    ):
+        self.namespace = namespace
+        self.path = path
+        self.llm_params = ""
+        # Shared with the caches returned by `bind`, so the counters cover the whole agent
+        self.store = SQLiteCacheStore("llm_responses", namespace, path, ttl, max_bytes)
+
+    def __repr__(self) -> str:
+        return f"LLMResponseCache(namespace={self.namespace!r}, path={self.path!r}, llm_params={self.llm_params!r})"
+
+    @property
+    def hits(self) -> int:
+        return self.store.hits
+
+    @property
+    def misses(self) -> int:
+        return self.store.misses
+
+    def bind(self, **llm_params: Any) -> "LLMResponseCache":
+        """Same cache with `llm_params`, e.g. model and temperature, added to every key."""
+        bound = copy.copy(self)
+        bound.llm_params = json.dumps(llm_params, sort_keys=True, default=repr)
+        return bound
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{self.llm_params}\x00{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        generations = self.store.get(self._key(prompt, llm_string))
+        return loads(generations, allowed_objects="core") if generations else None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        self.store.put(self._key(prompt, llm_string), dumps(list(return_val)))
+
+    def clear(self, **kwargs: Any):
+        self.store.clear()
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+def stream_with_cache(llm: BaseChatModel, input: Any, config: Optional[RunnableConfig] = None) -> Iterator[Any]:
+    """`llm.stream(input)` that also uses `llm.cache`, which langchain only consults for `invoke`/`generate`.
+
+    A hit is yielded as one chunk, a streamed miss is stored under the same key `invoke` would use.
+    """
+    cache = getattr(llm, "cache", None)
+    if not isinstance(cache, BaseCache):
+        yield from llm.stream(input, config)
+        return
+
+    messages = [message.model_copy(update={"id": None}) for message in llm._convert_input(input).to_messages()]
+    prompt, llm_string = dumps(messages), llm._get_llm_string()
+    cached = cache.lookup(prompt, llm_string)
+    if cached:
+        yield cached[0].message
+        return
+
+    final: Optional[BaseMessageChunk] = None
+    for chunk in llm.stream(messages, config):
+        final = chunk if final is None else final + chunk
+        yield chunk
+    if final is not None:
+        cache.update(prompt, llm_string, [ChatGeneration(message=message_chunk_to_message(final))])
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from langchain_community.agent_toolkits.openapi.spec import ReducedOpenAPISpec
+
+from agent.shared.api_client import APIRequestExecutor
+from agent.shared.contracts import ResponseValidator, compile_response_validator, response_schema
+from agent.shared.instrumentation import percentile
+from agent.shared.response_formats import APIPlanResponse
+from agent.shared.utils import request_api_by_plan
+
+ReplayPlan = tuple[APIPlanResponse, Optional[ResponseValidator]]
+
+
+def save_replay_plans(
+    filepath: str,
+    request_plans: list[APIPlanResponse],
+    request_results: list[dict],
+    open_api_spec: Optional[ReducedOpenAPISpec] = None,
+):
+    """Store the plans whose request succeeded with their response schema, to replay them without the planner LLM."""
+    endpoints = {endpoint[0]: endpoint for endpoint in open_api_spec.endpoints} if open_api_spec else {}
+    entries = []
+    for plan, result in zip(request_plans, request_results):
+        if not result.get("is_success"):
+            continue
+        endpoint = endpoints.get(result.get("operation"))
+        entries.append({"plan": plan.model_dump(), "response_schema": response_schema(endpoint) if endpoint else None})
+    with open(filepath, "w") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+
+
+def load_replay_plans(filepath: str, methods: Optional[list[str]] = None) -> list[ReplayPlan]:
+    """Load replay plans, response validators are compiled once per distinct schema."""
+    with open(filepath, "r") as f:
+        entries = json.load(f)
+
+    validators = {}
+    plans = []
+    for entry in entries:
+        plan = APIPlanResponse.model_validate(entry["plan"])
+        if methods and plan.method.upper() not in {method.upper() for method in methods}:
+            continue
+        schema = entry.get("response_schema")
+        schema_key = json.dumps(schema, sort_keys=True)
+        if schema_key not in validators:
+            validators[schema_key] = compile_response_validator({200: schema})
+        plans.append((plan, validators[schema_key]))
+    return plans
+
+
+@dataclass(kw_only=True)
+class EndpointLoadStats:
+    endpoint: str
+    latencies_ms: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies_ms)
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.count if self.count else 0.0
+
+    def summary(self, duration: float) -> dict:
+        latencies = sorted(self.latencies_ms)
+        return {
+            "endpoint": self.endpoint,
+            "requests": self.count,
+            "rps": round(self.count / duration, 2) if duration else 0.0,
+            "error_rate": round(self.error_rate, 4),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+        }
+
+
+def run_load_test(
+    server: str,
+    plans: list[ReplayPlan],
+    token: Optional[str] = None,
+    concurrency: int = 8,
+    duration: float = 30.0,
+    warmup: float = 5.0,
+    timeout: float = 10.0,
+) -> list[dict]:
+    """Replay `plans` round-robin from `concurrency` workers and report latency percentiles per endpoint.
+
+    Requests sent during the first `warmup` seconds are not measured. No retries are made, so every failure counts,
+    including responses violating the endpoint's response schema.
+    """
+    if not plans:
+        return []
+
+    executor = APIRequestExecutor(pool_size=concurrency, timeout=timeout, total_timeout=timeout, max_retries=0)
+    stats = {}
+    lock = threading.Lock()
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    def worker(offset: int):
+        index = offset
+        while (now := time.monotonic()) < stop_at:
+            plan, validator = plans[index % len(plans)]
+            index += 1
+            result = request_api_by_plan(server, plan, token, executor, validator)
+            if now < measure_from:
+                continue
+            key = f"{plan.method.upper()} {plan.endpoint}"
+            with lock:
+                endpoint_stats = stats.setdefault(key, EndpointLoadStats(endpoint=key))
+                endpoint_stats.latencies_ms.append(result["elapsed_ms"])
+                endpoint_stats.errors += 0 if result["is_success"] else 1
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+    finally:
+        executor.close()
+    return [endpoint_stats.summary(duration) for endpoint_stats in stats.values()]
+
+
+def format_load_test_report(report: list[dict]) -> str:
+    lines = [f"{'endpoint':<48}{'requests':>10}{'rps':>10}{'errors':>9}{'p50':>10}{'p95':>10}{'p99':>10}"]
+    for row in sorted(report, key=lambda row: row["p95_ms"], reverse=True):
+        lines.append(
+            f"{row['endpoint'][:47]:<48}{row['requests']:>10}{row['rps']:>10.1f}{row['error_rate']:>9.1%}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+        )
+    return "\n".join(lines)
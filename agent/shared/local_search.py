@@ -0,0 +1,337 @@
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from agent.shared.search import SearchBackend
+
+DEFAULT_LOCAL_SEARCH_INDEX_DIR = os.environ.get("LOCAL_SEARCH_INDEX_DIR", ".local_search_index")
+DOCUMENT_EXTENSIONS = (".md", ".markdown", ".txt", ".html", ".htm", ".pdf")
+INDEX_VERSION = 1
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+|[가-힣]+")
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """Lowercased latin words and digits, Hangul words as syllable bigrams so particles don't split matches."""
+    for word in WORD_PATTERN.findall(text.lower()):
+        if "가" <= word[0] <= "힣" and len(word) > 1:
+            yield from (word[i : i + 2] for i in range(len(word) - 1))
+        else:
+            yield word
+
+
+def extract_text(path: str) -> Optional[tuple[str, str]]:
+    """Title and plain text of a document, None when its format can't be read here."""
+    extension = os.path.splitext(path)[1].lower()
+    title = os.path.splitext(os.path.basename(path))[0]
+    if extension == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            return None
+        reader = PdfReader(path)
+        return (reader.metadata or {}).get("/Title") or title, "\n".join(
+            page.extract_text() or "" for page in reader.pages
+        )
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        content = f.read()
+    if extension in (".html", ".htm"):
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(content, "html.parser")
+        for element in soup(["script", "style", "noscript"]):
+            element.decompose()
+        if soup.title and soup.title.string:
+            title = soup.title.string.strip()
+        return title, soup.get_text("\n", strip=True)
+
+    heading = re.search(r"^#\s+(.+)$", content, re.MULTILINE)
+    return (heading.group(1).strip() if heading else title), content
+
+
+class LocalSearchIndex:
+    """BM25 inverted index of a directory of Markdown, text, HTML and PDF documents, kept on disk.
+
+    `postings.bin` holds `(doc_id, tf)` uint32 pairs per term and `texts.bin` the extracted texts, both memory-mapped
+    so a query reads only the postings of its terms. `update` reads only new and changed documents: their postings
+    are appended to the existing ones and the documents they replace are marked deleted, which queries skip. Once
+    `compact_ratio` of the documents are deleted the index is rebuilt from the stored texts.
+
+    Args:
+        directory: Documents to index, searched recursively.
+        index_dir: Index files, a directory per indexed directory under `LOCAL_SEARCH_INDEX_DIR` when None.
+        k1: BM25 term frequency saturation.
+        b: BM25 document length normalization.
+        compact_ratio: Share of deleted documents that triggers a rebuild.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        index_dir: Optional[str] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+        compact_ratio: float = 0.25,
+    ):
+        self.directory = os.path.abspath(directory)
+        self.index_dir = index_dir or os.path.join(
+            DEFAULT_LOCAL_SEARCH_INDEX_DIR, hashlib.sha256(self.directory.encode()).hexdigest()[:16]
+        )
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.documents: list[dict] = []
+        self.terms: dict[str, list[int]] = {}  # term -> [offset into postings, document frequency]
+        self.avgdl = 0.0
+        self._live = 0
+        self._postings: Optional[memoryview] = None
+        self._texts: Optional[mmap.mmap] = None
+        self._files = []
+        self._lock = threading.RLock()
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _load(self):
+        self._close_files()
+        try:
+            with open(self._path("meta.json"), "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("version") != INDEX_VERSION:
+            return
+        self.documents = meta["documents"]
+        self.terms = meta["terms"]
+        self.avgdl = meta["avgdl"]
+        self._live = sum(1 for document in self.documents if not document.get("deleted"))
+        postings = self._map("postings.bin")
+        self._postings = memoryview(postings).cast("I") if postings is not None else None
+        self._texts = self._map("texts.bin")
+
+    def _map(self, name: str) -> Optional[mmap.mmap]:
+        f = open(self._path(name), "rb")
+        if os.fstat(f.fileno()).st_size == 0:
+            f.close()
+            return None
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._files.append((f, mapped))
+        return mapped
+
+    def _close_files(self):
+        if self._postings is not None:
+            self._postings.release()
+        self._postings, self._texts = None, None
+        for f, mapped in self._files:
+            mapped.close()
+            f.close()
+        self._files = []
+
+    def close(self):
+        with self._lock:
+            self._close_files()
+
+    def text(self, doc_id: int) -> str:
+        with self._lock:
+            document = self.documents[doc_id]
+            if self._texts is None:
+                return ""
+            return self._texts[document["text_offset"] : document["text_offset"] + document["text_bytes"]].decode()
+
+    def _scan(self) -> dict[str, os.stat_result]:
+        files = {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.lower().endswith(DOCUMENT_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    files[os.path.relpath(path, self.directory)] = os.stat(path)
+        return files
+
+    def update(self) -> dict:
+        """Index new and changed documents and drop removed ones, the index files are replaced only on changes."""
+        started_at = time.perf_counter()
+        with self._lock:
+            files = self._scan()
+            live = {
+                document["path"]: doc_id
+                for doc_id, document in enumerate(self.documents)
+                if not document.get("deleted")
+            }
+            deleted = {live[path] for path in set(live) - set(files)}
+            stats = {"added": 0, "updated": 0, "removed": len(deleted), "skipped": 0}
+
+            entries = []
+            for path in sorted(files):
+                stat, doc_id = files[path], live.get(path)
+                if doc_id is not None:
+                    document = self.documents[doc_id]
+                    if document["mtime_ns"] == stat.st_mtime_ns and document["size"] == stat.st_size:
+                        continue
+                    deleted.add(doc_id)
+                extracted = extract_text(os.path.join(self.directory, path))
+                if extracted is None:
+                    stats["skipped"] += 1
+                    continue
+                stats["updated" if doc_id is not None else "added"] += 1
+                title, text = extracted
+                document = {"path": path, "title": title, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+                entries.append((document, Counter(tokenize(text)), text))
+
+            if entries or deleted or not os.path.exists(self._path("meta.json")):
+                documents = [
+                    {**document, "deleted": True} if doc_id in deleted else document
+                    for doc_id, document in enumerate(self.documents)
+                ]
+                dead = sum(1 for document in documents if document.get("deleted"))
+                if dead > self.compact_ratio * (len(documents) + len(entries)):
+                    kept = []
+                    for doc_id, document in enumerate(documents):
+                        if not document.get("deleted"):
+                            text = self.text(doc_id)
+                            kept.append((document, Counter(tokenize(text)), text))
+                    stats["compacted"] = dead
+                    self._write([], kept + entries)
+                else:
+                    self._write(documents, entries)
+                self._load()
+        stats["documents"] = self._live
+        stats["terms"] = len(self.terms)
+        stats["seconds"] = round(time.perf_counter() - started_at, 3)
+        return stats
+
+    def _write(self, documents: list[dict], entries: list[tuple[dict, Counter, str]]):
+        """Write `documents`, whose postings and texts are already indexed, followed by the new `entries`."""
+        os.makedirs(self.index_dir, exist_ok=True)
+        # Without existing documents (first build, compaction) the old postings and texts are dropped
+        appending = bool(documents)
+        documents = [dict(document) for document in documents]
+        new_postings: dict[str, array] = {}
+        for doc_id, (document, counts, _) in enumerate(entries, start=len(documents)):
+            document["length"] = sum(counts.values())
+            documents.append(document)
+            for term, tf in counts.items():
+                new_postings.setdefault(term, array("I")).extend((doc_id, tf))
+
+        # Postings of one term stay contiguous, the existing ones are copied as whole slices
+        old_postings, old_terms = (self._postings, self.terms) if appending else (None, {})
+        postings, terms = array("I"), {}
+        for term in sorted(old_terms.keys() | new_postings.keys()):
+            offset, df = len(postings), 0
+            if term in old_terms:
+                old_offset, df = old_terms[term]
+                postings.frombytes(old_postings[old_offset : old_offset + 2 * df].cast("B"))
+            if term in new_postings:
+                postings.extend(new_postings[term])
+                df += len(new_postings[term]) // 2
+            terms[term] = [offset, df]
+
+        text_offset = len(self._texts) if appending and self._texts is not None else 0
+        encoded_texts = []
+        for document, _, text in entries:
+            encoded = text.encode()
+            document["text_offset"], document["text_bytes"] = text_offset, len(encoded)
+            text_offset += len(encoded)
+            encoded_texts.append(encoded)
+
+        lengths = [document["length"] for document in documents if not document.get("deleted")]
+        meta = {
+            "version": INDEX_VERSION,
+            "directory": self.directory,
+            "avgdl": sum(lengths) / len(lengths) if lengths else 0.0,
+            "documents": documents,
+            "terms": terms,
+        }
+
+        def write_texts(f):
+            if appending and self._texts is not None:
+                f.write(self._texts)
+            f.writelines(encoded_texts)
+
+        # Readers keep the old files mapped until they reload, meta.json goes last
+        for name, write in (
+            ("postings.bin", lambda f: postings.tofile(f)),
+            ("texts.bin", write_texts),
+            ("meta.json", lambda f: f.write(json.dumps(meta, ensure_ascii=False).encode())),
+        ):
+            with open(self._path(f"{name}.tmp"), "wb") as f:
+                write(f)
+            os.replace(self._path(f"{name}.tmp"), self._path(name))
+
+    def search(self, query: str, max_results: int = 3) -> list[tuple[float, int]]:
+        """`(score, doc_id)` of the best BM25 matches of `query`, best first."""
+        scores: dict[int, float] = {}
+        with self._lock:
+            postings, documents = self._postings, self.documents
+            if postings is None or not self._live:
+                return []
+            for term in set(tokenize(query)):
+                entry = self.terms.get(term)
+                if entry is None:
+                    continue
+                offset, df = entry
+                idf = math.log(1 + (self._live - df + 0.5) / (df + 0.5))
+                for i in range(offset, offset + 2 * df, 2):
+                    document, tf = documents[postings[i]], postings[i + 1]
+                    if document.get("deleted"):
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * document["length"] / self.avgdl)
+                    scores[postings[i]] = scores.get(postings[i], 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return [(score, doc_id) for doc_id, score in heapq.nlargest(max_results, scores.items(), key=lambda x: x[1])]
+
+
+def snippet(text: str, query: str, size: int = 400) -> str:
+    """`size` characters of `text` around the first query word it contains."""
+    lowered = text.lower()
+    positions = [position for word in WORD_PATTERN.findall(query.lower()) if (position := lowered.find(word)) >= 0]
+    start = max(min(positions, default=0) - size // 4, 0)
+    return " ".join(text[start : start + size].split())
+
+
+class LocalSearchBackend(SearchBackend):
+    """Searches a local `LocalSearchIndex` instead of the web, no network needed. The index is updated once here."""
+
+    name = "local"
+
+    def __init__(self, directory: str, index_dir: Optional[str] = None):
+        self.index = LocalSearchIndex(directory, index_dir)
+        self.index.update()
+
+    def search(self, query: str, max_results: int, include_raw_content: bool, **params: Any) -> dict:
+        results = []
+        for score, doc_id in self.index.search(query, max_results):
+            document, text = self.index.documents[doc_id], self.index.text(doc_id)
+            results.append(
+                {
+                    "title": document["title"],
+                    "url": Path(self.index.directory, document["path"]).as_uri(),
+                    "content": snippet(text, query),
+                    "score": round(score, 4),
+                    "raw_content": text if include_raw_content else None,
+                }
+            )
+        return {"query": query, "results": results}
+
+
+_backends: dict[str, LocalSearchBackend] = {}
+_lock = threading.Lock()
+
+
+def get_local_search_backend(directory: str) -> LocalSearchBackend:
+    """Shared backend per directory, so its index is updated and mapped once per process."""
+    directory = os.path.abspath(directory)
+    with _lock:
+        if directory not in _backends:
+            _backends[directory] = LocalSearchBackend(directory)
+        return _backends[directory]
@@ -0,0 +1,288 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
+
+from agent.shared.instrumentation import QUEUE_WAIT_METADATA_KEY
+
+DEFAULT_RUN_ID = "default"
+# Calls Ollama runs at once for a loaded model
+DEFAULT_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "1"))
+_STREAM_END = object()
+
+
+@dataclass(kw_only=True)
+class ScheduledCall:
+    model: str
+    func: Callable[[], Any]
+    run_id: str
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass(kw_only=True)
+class RunMetrics:
+    """Calls of one run, the model swaps they waited for and their time in the queue.
+
+    A swap serving the queued calls of several runs counts for each of them.
+    """
+
+    calls: int = 0
+    swaps: int = 0
+    queue_ms: float = 0.0
+
+
+class ModelScheduler:
+    """Runs LLM calls of concurrent graph runs grouped by model, so an Ollama box reloads weights less often.
+
+    Pending calls wait in one queue per model. Calls for the resident model run first; once its queue is empty the
+    scheduler waits up to `max_wait` seconds for more of them before switching to the model with the oldest call. It
+    switches right away when every run served in that time is queued again, e.g. a single sequential run.
+
+    Args:
+        max_wait: Seconds an idle resident model is kept before switching, the queueing latency traded for fewer swaps.
+        parallel: Calls of the resident model running at once, match Ollama's `OLLAMA_NUM_PARALLEL`.
+        max_consecutive: Calls in a row for one model while others wait, bounds how long other models starve.
+    """
+
+    def __init__(self, max_wait: float = 0.5, parallel: int = DEFAULT_PARALLEL, max_consecutive: int = 32):
+        self.max_wait = max_wait
+        self.parallel = parallel
+        self.max_consecutive = max_consecutive
+
+        self._condition = threading.Condition()
+        self._queues: dict[str, deque[ScheduledCall]] = {}
+        self._resident: Optional[str] = None
+        self._resident_active_at = 0.0
+        self._consecutive = 0
+        self._in_flight = 0
+        self._closed = False
+
+        self._loads = 0
+        self._swaps = 0
+        self._calls_per_model: dict[str, int] = {}
+        self._runs: dict[str, RunMetrics] = {}
+        self._finished_at: dict[str, float] = {}
+        self._max_queue_ms = 0.0
+
+        self._executor = ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="model-scheduler")
+        self._dispatcher = threading.Thread(target=self._dispatch, name="model-scheduler-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, model: str, func: Callable[[], Any], run_id: str = DEFAULT_RUN_ID) -> Future:
+        call = ScheduledCall(model=model, func=func, run_id=run_id)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("ModelScheduler is closed")
+            self._queues.setdefault(model, deque()).append(call)
+            if model == self._resident:
+                self._resident_active_at = time.monotonic()
+            self._condition.notify_all()
+        return call.future
+
+    def run(self, model: str, func: Callable[[], Any], run_id: str = DEFAULT_RUN_ID) -> Any:
+        return self.submit(model, func, run_id).result()
+
+    def wrap(self, runnable: Runnable, model: str) -> "ScheduledRunnable":
+        """Route `invoke`, `stream` and their async variants of `runnable` through the scheduler."""
+        return ScheduledRunnable(self, runnable, model)
+
+    def metrics(self) -> dict:
+        with self._condition:
+            calls = sum(self._calls_per_model.values())
+            queue_ms = sum(run.queue_ms for run in self._runs.values())
+            return {
+                "resident_model": self._resident,
+                "loads": self._loads,
+                "swaps": self._swaps,
+                "calls": calls,
+                "calls_per_model": dict(self._calls_per_model),
+                "avg_queue_ms": round(queue_ms / calls, 2) if calls else 0.0,
+                "max_queue_ms": round(self._max_queue_ms, 2),
+                "pending": sum(len(queue) for queue in self._queues.values()),
+                "runs": {
+                    run_id: {"calls": run.calls, "swaps": run.swaps, "queue_ms": round(run.queue_ms, 2)}
+                    for run_id, run in self._runs.items()
+                },
+            }
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def _next_model(self) -> Optional[str]:
+        waiting = {model: queue[0].submitted_at for model, queue in self._queues.items() if queue}
+        if not waiting:
+            return None
+        if self._resident in waiting and (self._consecutive < self.max_consecutive or len(waiting) == 1):
+            return self._resident
+        others = {model: submitted_at for model, submitted_at in waiting.items() if model != self._resident}
+        return min(others or waiting, key=(others or waiting).get)
+
+    def _dispatch(self):
+        with self._condition:
+            while True:
+                model = self._next_model()
+                if model is None:
+                    if self._closed:
+                        return
+                    self._condition.wait()
+                    continue
+
+                if model != self._resident:
+                    # Running calls may queue follow-up calls for the resident model, switch only once it's idle.
+                    if self._in_flight:
+                        self._condition.wait()
+                        continue
+                    remaining = self._resident_active_at + self.max_wait - time.monotonic()
+                    if (
+                        self._resident is not None
+                        and remaining > 0
+                        and self._consecutive < self.max_consecutive
+                        and self._may_follow_up()
+                    ):
+                        self._condition.wait(timeout=remaining)
+                        continue
+                    self._switch_to(model)
+
+                if self._in_flight >= self.parallel:
+                    self._condition.wait()
+                    continue
+                self._start(self._queues[model].popleft())
+
+    def _may_follow_up(self) -> bool:
+        """Whether a run served within `max_wait` isn't queued again, only such a run can still call the resident
+        model. A run whose calls are all waiting for other models, e.g. the only one, has no reason to be waited for."""
+        now = time.monotonic()
+        queued = {call.run_id for queue in self._queues.values() for call in queue}
+        return any(
+            run_id not in queued and now - finished_at < self.max_wait
+            for run_id, finished_at in self._finished_at.items()
+        )
+
+    def _switch_to(self, model: str):
+        if self._resident is None:
+            self._loads += 1
+        else:
+            self._swaps += 1
+            for run_id in {call.run_id for call in self._queues[model]}:
+                self._runs.setdefault(run_id, RunMetrics()).swaps += 1
+        self._resident = model
+        self._consecutive = 0
+
+    def _start(self, call: ScheduledCall):
+        queue_ms = (time.monotonic() - call.submitted_at) * 1000
+        run = self._runs.setdefault(call.run_id, RunMetrics())
+        run.calls += 1
+        run.queue_ms += queue_ms
+        self._max_queue_ms = max(self._max_queue_ms, queue_ms)
+        self._calls_per_model[call.model] = self._calls_per_model.get(call.model, 0) + 1
+        self._consecutive += 1
+        self._in_flight += 1
+        self._executor.submit(self._execute, call)
+
+    def _execute(self, call: ScheduledCall):
+        try:
+            call.future.set_result(call.func())
+        except BaseException as e:
+            call.future.set_exception(e)
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._resident_active_at = self._finished_at[call.run_id] = time.monotonic()
+                self._condition.notify_all()
+
+
+class ScheduledRunnable(Runnable):
+    """A runnable whose calls wait for their model's turn in a `ModelScheduler`.
+
+    The run is the graph's `thread_id` when configured. A stream holds its slot until it's exhausted or closed, its
+    chunks are handed over as they arrive. Other attributes, e.g. the `cache` of a chat model, are the wrapped one's.
+    """
+
+    def __init__(self, scheduler: ModelScheduler, runnable: Runnable, model: str):
+        self.scheduler = scheduler
+        self.runnable = runnable
+        self.model = model
+        self.name = f"scheduled:{model}"
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "runnable":
+            raise AttributeError(name)
+        return getattr(self.runnable, name)
+
+    @staticmethod
+    def _run_id(config: RunnableConfig) -> str:
+        return str((config.get("configurable") or {}).get("thread_id", DEFAULT_RUN_ID))
+
+    def _submit(self, config: RunnableConfig, func: Callable[[RunnableConfig], Any]) -> Future:
+        submitted_at = time.monotonic()
+
+        def run():
+            # The wrapped runnable's callbacks start with the call, they learn about the wait from its metadata
+            queue_wait_ms = round((time.monotonic() - submitted_at) * 1000, 2)
+            return func({**config, "metadata": {**config.get("metadata", {}), QUEUE_WAIT_METADATA_KEY: queue_wait_ms}})
+
+        return self.scheduler.submit(self.model, run, self._run_id(config))
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self._submit(
+            ensure_config(config), lambda config: self.runnable.invoke(input, config, **kwargs)
+        ).result()
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        future = self._submit(ensure_config(config), lambda config: self.runnable.invoke(input, config, **kwargs))
+        return await asyncio.wrap_future(future)
+
+    def _submit_stream(
+        self, input: Any, config: RunnableConfig, put: Callable[[Any], None], stop: threading.Event, **kwargs: Any
+    ) -> Future:
+        def produce(config: RunnableConfig):
+            stream = self.runnable.stream(input, config, **kwargs)
+            try:
+                for chunk in stream:
+                    if stop.is_set():
+                        break
+                    put(chunk)
+            finally:
+                stream.close()
+
+        future = self._submit(config, produce)
+        future.add_done_callback(lambda _: put(_STREAM_END))
+        return future
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        config = ensure_config(config)
+        chunks, stop = queue.Queue(), threading.Event()
+        future = self._submit_stream(input, config, chunks.put, stop, **kwargs)
+        try:
+            while (chunk := chunks.get()) is not _STREAM_END:
+                yield chunk
+            future.result()
+        finally:
+            # Closing the stream early ends the call, which frees the model for the next one
+            stop.set()
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        config = ensure_config(config)
+        loop = asyncio.get_running_loop()
+        chunks, stop = asyncio.Queue(), threading.Event()
+        future = self._submit_stream(
+            input, config, lambda chunk: loop.call_soon_threadsafe(chunks.put_nowait, chunk), stop, **kwargs
+        )
+        try:
+            while (chunk := await chunks.get()) is not _STREAM_END:
+                yield chunk
+            await asyncio.wrap_future(future)
+        finally:
+            stop.set()
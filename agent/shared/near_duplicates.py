@@ -0,0 +1,133 @@
+import hashlib
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+from agent.shared.tokens import TokenCounter
+
+# Query parameters that identify the visitor or campaign, not the page
+TRACKING_PARAMETERS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref_src"}
+TRACKING_PREFIXES = ("utm_", "_hs", "pk_", "mtm_")
+
+# Smallest prime above 2**32: with 32-bit shingle hashes and 31-bit multipliers the permutations fit in uint64
+PERMUTATION_PRIME = 4294967311
+SHINGLE_PATTERN = re.compile(r"\w+")
+
+
+def canonicalize_url(url: str) -> str:
+    """Scheme, `www.`, default ports, fragments, trailing slashes, tracking and parameter order don't change the page."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower().removeprefix("www.")
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMETERS and not name.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit(("", host, parts.path.rstrip("/") or "/", urlencode(query), "")).removeprefix("//")
+
+
+def shingles(text: str, size: int = 5) -> set[int]:
+    """32-bit hashes of the overlapping `size`-word runs of `text`, case and punctuation ignored."""
+    words = SHINGLE_PATTERN.findall(text.lower())
+    runs = (" ".join(words[i : i + size]) for i in range(max(len(words) - size + 1, 1)))
+    return {int.from_bytes(hashlib.blake2b(run.encode(), digest_size=4).digest(), "big") for run in runs if run}
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of the sources seen in a run, with LSH bands to find near-duplicates without comparing all.
+
+    Two texts are near-duplicates when the estimated Jaccard similarity of their word shingles reaches `threshold`.
+    Signatures are plain int lists, so a graph can keep them in its state and rebuild the index in any node.
+
+    Args:
+        threshold: Estimated shingle similarity from which a text counts as already seen.
+        num_perm: MinHash permutations, more estimate the similarity more precisely.
+        bands: LSH bands of `num_perm // bands` rows, more find candidates of lower similarity.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Fixed permutations, so signatures of one run stay comparable across processes and restarts
+        seeds = [hashlib.blake2b(f"minhash{i}".encode(), digest_size=8).digest() for i in range(num_perm)]
+        self._a = np.array([int.from_bytes(seed[:4], "big") % (1 << 31) + 1 for seed in seeds], dtype=np.uint64)
+        self._b = np.array([int.from_bytes(seed[4:], "big") for seed in seeds], dtype=np.uint64)
+        self._signatures: dict[str, list[int]] = {}
+        self._buckets: dict[tuple, set[str]] = {}
+
+    def signature(self, text: str) -> list[int]:
+        """MinHash signature of `text`, empty for a text without words."""
+        hashes = shingles(text)
+        if not hashes:
+            return []
+        values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        permuted = (np.outer(self._a, values) + self._b[:, None]) % np.uint64(PERMUTATION_PRIME)
+        return permuted.min(axis=1).tolist()
+
+    def _bands(self, signature: list[int]):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows : (band + 1) * self.rows])
+
+    def add(self, key: str, signature: list[int]):
+        self._signatures[key] = signature
+        if not signature:
+            return
+        for band in self._bands(signature):
+            self._buckets.setdefault(band, set()).add(key)
+
+    def find(self, signature: list[int]) -> Optional[str]:
+        """Key of a seen near-duplicate of `signature`, None when it's new."""
+        if not signature:
+            return None
+        candidates = set().union(*(self._buckets.get(band, ()) for band in self._bands(signature)))
+        for key in candidates:
+            seen = self._signatures[key]
+            if sum(1 for x, y in zip(seen, signature) if x == y) / self.num_perm >= self.threshold:
+                return key
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._signatures
+
+    @classmethod
+    def from_signatures(cls, signatures: list[dict], threshold: float = 0.8) -> "NearDuplicateIndex":
+        """Index of `{"url", "signature"}` entries as returned by `drop_near_duplicates`."""
+        index = cls(threshold=threshold)
+        for entry in signatures:
+            index.add(entry["url"], entry["signature"])
+        return index
+
+
+def drop_near_duplicates(
+    search_response: dict,
+    index: NearDuplicateIndex,
+    token_counter: TokenCounter,
+    max_tokens_per_source: int,
+) -> tuple[dict, list[dict], dict]:
+    """Drop results whose canonical URL or content the run has already seen, and index the others.
+
+    Returns:
+        The response with only new results, `{"url", "signature"}` of the new results to keep in the run's state,
+        and `{"sources", "tokens"}` skipped, tokens as the dropped sources would have taken in the prompt.
+    """
+    kept, new_signatures, skipped = [], [], {"sources": 0, "tokens": 0}
+    for result in search_response["results"]:
+        url = canonicalize_url(result["url"])
+        text = result.get("raw_content") or result.get("content") or ""
+        signature = index.signature(text)
+        if url in index or index.find(signature) is not None:
+            skipped["sources"] += 1
+            skipped["tokens"] += token_counter.count(result.get("content")) + min(
+                token_counter.count(result.get("raw_content")), max_tokens_per_source
+            )
+            continue
+        index.add(url, signature)
+        kept.append(result)
+        new_signatures.append({"url": url, "signature": signature})
+    return {**search_response, "results": kept}, new_signatures, skipped
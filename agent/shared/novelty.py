@@ -0,0 +1,32 @@
+import os
+from typing import Optional
+
+from agent.shared.near_duplicates import shingles
+
+# Research stops once CONVERGENCE_PATIENCE summary updates in a row each were less than MIN_INFORMATION_GAIN new
+# content. One low update can be a weak batch of sources, so it takes two. CONVERGENCE_PATIENCE=0 never stops early.
+DEFAULT_MIN_INFORMATION_GAIN = float(os.environ.get("MIN_INFORMATION_GAIN", "0.15"))
+DEFAULT_CONVERGENCE_PATIENCE = int(os.environ.get("CONVERGENCE_PATIENCE", "2"))
+
+
+def information_gain(known: Optional[str], update: Optional[str], size: int = 3) -> float:
+    """Share of the `size`-word shingles of `update` that `known` didn't have, 1.0 for a first summary.
+
+    `update` is what the model wrote this loop, a delta of new sections or a rewritten summary. Measured against the
+    whole summary instead, the same new facts would count for less the longer the summary grows.
+    """
+    update_shingles = shingles(update or "", size)
+    if not update_shingles:
+        return 0.0
+    if not known:
+        return 1.0
+    return len(update_shingles - shingles(known, size)) / len(update_shingles)
+
+
+def has_converged(
+    gains: list[float],
+    min_gain: float = DEFAULT_MIN_INFORMATION_GAIN,
+    patience: int = DEFAULT_CONVERGENCE_PATIENCE,
+) -> bool:
+    """Whether the last `patience` summary updates each had less than `min_gain` new information."""
+    return patience > 0 and len(gains) >= patience and all(gain < min_gain for gain in gains[-patience:])
@@ -0,0 +1,110 @@
+from typing import Any, Iterable, Optional
+
+from langchain_community.agent_toolkits.openapi.spec import ReducedOpenAPISpec
+
+TARGET_METHODS = ("get", "post", "patch", "put", "delete")
+
+
+class OpenAPIReducer:
+    """Reduces one loaded OpenAPI spec for any number of env/tag selections.
+
+    The tag -> operation index is built once, and resolved `$ref` targets are memoized across endpoints, so shared
+    component schemas (pagination envelopes, error bodies, ...) are only dereferenced once per spec. Schemas within a
+    reference cycle are cut depending on where the resolution started, so they are resolved again every time.
+    """
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.tag_index: dict[str, list[int]] = {}
+        self.operations: list[tuple[str, str, dict]] = []
+        self._resolved_refs: dict[str, Any] = {}
+        self._cycle_cuts = 0
+
+        for route, operation in spec["paths"].items():
+            for operation_name, docs in operation.items():
+                if operation_name.lower() not in TARGET_METHODS:
+                    continue
+                position = len(self.operations)
+                self.operations.append((f"{operation_name.upper()} {route}", docs.get("description"), docs))
+                for tag in docs.get("tags") or []:
+                    self.tag_index.setdefault(tag.lower(), []).append(position)
+
+    def select_operations(self, target_tags: Optional[Iterable[str]] = None) -> list[tuple[str, str, dict]]:
+        """Operations having any of `target_tags` in spec order, none when no tags are given."""
+        positions = set()
+        for tag in target_tags or ():
+            positions.update(self.tag_index.get(tag.lower(), []))
+        return [self.operations[position] for position in sorted(positions)]
+
+    def reduce(
+        self,
+        target_server_env: str = None,
+        target_tags: list[str] = None,
+        dereference: bool = True,
+    ) -> ReducedOpenAPISpec:
+        target_server_env = target_server_env or "dev"
+        servers = [server for server in self.spec["servers"] if target_server_env in server["url"]]
+        if not servers:
+            raise ValueError(f"Server {target_server_env} not found in {self.spec['servers']}")
+
+        endpoints = []
+        for name, description, docs in self.select_operations(target_tags):
+            if dereference:
+                docs = self.dereference(docs)
+            endpoints.append((name, description, reduce_endpoint_docs(docs)))
+        return ReducedOpenAPISpec(servers=servers, description="", endpoints=endpoints)
+
+    def dereference(self, value: Any) -> Any:
+        return self._dereference(value, ())
+
+    def _dereference(self, value: Any, resolving: tuple[str, ...]) -> Any:
+        if isinstance(value, list):
+            return [self._dereference(item, resolving) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        ref = value.get("$ref")
+        if not isinstance(ref, str):
+            return {key: self._dereference(item, resolving) for key, item in value.items()}
+
+        resolved = self._resolve_ref(ref, resolving)
+        siblings = {key: self._dereference(item, resolving) for key, item in value.items() if key != "$ref"}
+        if siblings and isinstance(resolved, dict):
+            return {**resolved, **siblings}
+        return resolved
+
+    def _resolve_ref(self, ref: str, resolving: tuple[str, ...]) -> Any:
+        if ref in self._resolved_refs:
+            return self._resolved_refs[ref]
+        if ref in resolving:
+            # Circular reference, cut it the same way `langchain_core.utils.json_schema.dereference_refs` does.
+            self._cycle_cuts += 1
+            return {}
+
+        cycle_cuts = self._cycle_cuts
+        resolved = self._dereference(self._lookup_ref(ref), resolving + (ref,))
+        if self._cycle_cuts == cycle_cuts:
+            self._resolved_refs[ref] = resolved
+        return resolved
+
+    def _lookup_ref(self, ref: str) -> Any:
+        if not ref.startswith("#/"):
+            raise ValueError(f"Only local references are supported: {ref}")
+        target = self.spec
+        for part in ref[2:].split("/"):
+            part = part.replace("~1", "/").replace("~0", "~")
+            target = target[int(part)] if isinstance(target, list) else target[part]
+        return target
+
+
+def reduce_endpoint_docs(docs: dict) -> dict:
+    out = {}
+    if docs.get("description"):
+        out["description"] = docs.get("description")
+    if docs.get("parameters"):
+        out["parameters"] = [parameter for parameter in docs.get("parameters", []) if parameter.get("required")]
+    if "200" in docs["responses"]:
+        out["responses"] = docs["responses"]["200"]
+    if docs.get("requestBody"):
+        out["requestBody"] = docs.get("requestBody")
+    return out
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Optional
+
+from agent.shared.response_formats import APIPlanResponse
+from agent.shared.scheduler import PATH_PARAMETER_PATTERN, is_id_field, normalize_id_key
+
+DEFAULT_PLAN_CACHE_PATH = os.environ.get("PLAN_CACHE_PATH", ".plan_cache.sqlite3")
+
+
+def endpoint_schema_hash(endpoint: tuple[str, str, dict]) -> str:
+    return hashlib.sha256(json.dumps(endpoint, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def id_replacements(old_values: list, new_entries: list[dict]) -> dict:
+    """Old -> new values of one ID key, paired newest to newest. Older values without a counterpart get the oldest."""
+    new_values = [entry["value"] for entry in new_entries]
+    replacements = {}
+    for position, old_value in enumerate(reversed(old_values)):
+        new_value = new_values[max(len(new_values) - 1 - position, 0)]
+        replacements.setdefault(old_value, new_value)
+        replacements.setdefault(str(old_value), str(new_value))
+    return replacements
+
+
+def replace_id_values(value: Any, replacements: dict[str, dict], id_key: Optional[str] = None) -> Any:
+    """Swap old ID values for new ones, only under fields of the same ID key so unrelated equal values are kept."""
+    if isinstance(value, dict):
+        return {
+            key: replace_id_values(item, replacements, normalize_id_key(key) if is_id_field(key) else None)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [replace_id_values(item, replacements, id_key) for item in value]
+    if id_key in replacements and isinstance(value, (str, int)) and not isinstance(value, bool):
+        return replacements[id_key].get(value, value)
+    return value
+
+
+def replace_path_ids(endpoint: str, template: str, replacements: dict[str, dict]) -> str:
+    """Swap the old IDs in the path segments of `endpoint` that are ID parameters in the `template` route."""
+    segments, template_segments = endpoint.split("/"), template.split("/")
+    if len(segments) != len(template_segments):
+        return endpoint
+    for position, template_segment in enumerate(template_segments):
+        matched = PATH_PARAMETER_PATTERN.match(template_segment)
+        if matched:
+            resource = template_segments[position - 1] if position > 0 else None
+            key_replacements = replacements.get(normalize_id_key(matched.group(1), resource), {})
+            segments[position] = str(key_replacements.get(segments[position], segments[position]))
+    return "/".join(segments)
+
+
+class PlanCache:
+    """Persistent `APIPlanResponse` cache so unchanged endpoints are replayed without calling the planner LLM.
+
+    Plans are keyed by endpoint name, a hash of the reduced endpoint doc and the ID keys it consumed. The ID values a
+    plan was built with are stored next to it and swapped for the current candidate IDs on replay, since re-runs
+    create fresh resources. Changing the endpoint schema drops its older plans.
+    """
+
+    def __init__(self, path: str = DEFAULT_PLAN_CACHE_PATH):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                " endpoint TEXT NOT NULL, schema_hash TEXT NOT NULL, id_keys TEXT NOT NULL,"
+                " plan TEXT NOT NULL, id_values TEXT NOT NULL, created_at REAL NOT NULL,"
+                " PRIMARY KEY (endpoint, schema_hash, id_keys))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _id_keys(candidate_ids: dict[str, list[dict]]) -> str:
+        return ",".join(sorted(key for key, entries in candidate_ids.items() if entries))
+
+    def get(self, endpoint: tuple[str, str, dict], candidate_ids: dict[str, list[dict]]) -> Optional[APIPlanResponse]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT plan, id_values FROM plans WHERE endpoint = ? AND schema_hash = ? AND id_keys = ?",
+                (endpoint[0], endpoint_schema_hash(endpoint), self._id_keys(candidate_ids)),
+            ).fetchone()
+        if row is None:
+            return None
+
+        plan, id_values = json.loads(row[0]), json.loads(row[1])
+        replacements = {
+            key: id_replacements(old_values, candidate_ids[key])
+            for key, old_values in id_values.items()
+            if candidate_ids.get(key)
+        }
+
+        plan["endpoint"] = replace_path_ids(plan["endpoint"], endpoint[0].split(" ", 1)[1], replacements)
+        plan["query_params"] = replace_id_values(plan.get("query_params"), replacements)
+        plan["payload"] = replace_id_values(plan.get("payload"), replacements)
+        return APIPlanResponse.model_validate(plan)
+
+    def put(self, endpoint: tuple[str, str, dict], candidate_ids: dict[str, list[dict]], plan: APIPlanResponse):
+        schema_hash = endpoint_schema_hash(endpoint)
+        id_values = {key: [entry["value"] for entry in entries] for key, entries in candidate_ids.items() if entries}
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM plans WHERE endpoint = ? AND schema_hash != ?", (endpoint[0], schema_hash))
+            conn.execute(
+                "INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    endpoint[0],
+                    schema_hash,
+                    self._id_keys(candidate_ids),
+                    plan.model_dump_json(),
+                    json.dumps(id_values),
+                    time.time(),
+                ),
+            )
+
+    def invalidate(self, endpoint: tuple[str, str, dict]):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM plans WHERE endpoint = ?", (endpoint[0],))
@@ -0,0 +1,123 @@
+from dataclasses import dataclass, asdict
+from typing import Any, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from agent.shared.llm_cache import stream_with_cache
+from agent.shared.tokens import estimate_tokens
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+def partial_tag_length(text: str, tag: str) -> int:
+    """Length of the longest suffix of `text` that is a prefix of `tag`, i.e. a tag split across chunks."""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+class ThinkFilter:
+    """Drops `<think>...</think>` blocks from text fed chunk by chunk, counting reasoning and answer tokens.
+
+    An unclosed block drops everything after `<think>`, tags split across chunks are held back until complete.
+    """
+
+    def __init__(self):
+        self.in_think = False
+        self.reasoning_tokens = 0
+        self.answer_tokens = 0
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        """Returns the answer text of `text` that can be emitted now."""
+        text = self._pending + text
+        self._pending = ""
+        answer = []
+        while text:
+            tag = THINK_CLOSE if self.in_think else THINK_OPEN
+            index = text.find(tag)
+            if index == -1:
+                split_at = len(text) - partial_tag_length(text, tag)
+                answer.append(self._count(text[:split_at]))
+                self._pending = text[split_at:]
+                break
+            answer.append(self._count(text[:index]))
+            text = text[index + len(tag) :]
+            self.in_think = not self.in_think
+        return "".join(answer)
+
+    def flush(self) -> str:
+        """Returns held back text once the stream has ended."""
+        text, self._pending = self._pending, ""
+        return self._count(text)
+
+    def count_reasoning(self, text: str):
+        """Count reasoning delivered outside of the content, e.g. Ollama's `reasoning_content` with `reasoning=True`."""
+        self.reasoning_tokens += estimate_tokens(text)
+
+    def _count(self, text: str) -> str:
+        if self.in_think:
+            self.reasoning_tokens += estimate_tokens(text)
+            return ""
+        self.answer_tokens += estimate_tokens(text)
+        return text
+
+
+def strip_think(text: str) -> str:
+    think_filter = ThinkFilter()
+    return (think_filter.feed(text) + think_filter.flush()).strip()
+
+
+@dataclass(kw_only=True)
+class ReasoningStats:
+    reasoning_tokens: int = 0
+    answer_tokens: int = 0
+    budget_exceeded: bool = False
+    fallback_answer_tokens: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def invoke_with_reasoning_budget(
+    llm: Runnable,
+    input: Any,
+    config: Optional[RunnableConfig] = None,
+    max_reasoning_tokens: Optional[int] = None,
+    fallback: Optional[Runnable] = None,
+) -> tuple[str, ReasoningStats]:
+    """Stream a reasoning model's answer with `<think>` blocks dropped as they arrive.
+
+    Once the reasoning passes `max_reasoning_tokens` the stream is closed, which stops generation on the server,
+    and `fallback` answers instead. The default fallback is the same model with thinking disabled
+    (`reasoning=False` of ChatOllama).
+
+    Returns:
+        The answer without reasoning and the reasoning/answer token counts of the call.
+    """
+    think_filter = ThinkFilter()
+    stats = ReasoningStats()
+    answer = []
+    stream = stream_with_cache(llm, input, config)
+    try:
+        for chunk in stream:
+            if reasoning_content := chunk.additional_kwargs.get("reasoning_content"):
+                think_filter.count_reasoning(reasoning_content)
+            answer.append(think_filter.feed(chunk.content if isinstance(chunk.content, str) else ""))
+            if max_reasoning_tokens is not None and think_filter.reasoning_tokens > max_reasoning_tokens:
+                stats.budget_exceeded = True
+                break
+    finally:
+        stream.close()
+    answer.append(think_filter.flush())
+    stats.reasoning_tokens = think_filter.reasoning_tokens
+    stats.answer_tokens = think_filter.answer_tokens
+
+    if stats.budget_exceeded:
+        fallback = fallback or llm.bind(reasoning=False)
+        fallback_answer = strip_think(fallback.invoke(input, config).content)
+        stats.fallback_answer_tokens = estimate_tokens(fallback_answer)
+        return fallback_answer, stats
+    return "".join(answer).strip(), stats
@@ -0,0 +1,64 @@
+import json
+from collections import Counter
+
+from agent.shared.tokens import estimate_tokens
+
+
+def summarize_request_results(request_results: list[dict]) -> dict:
+    """Pass/fail statistics of API test results, computed here instead of by the LLM."""
+    total = len(request_results)
+    passed = sum(1 for result in request_results if result.get("is_success"))
+    latencies = [result["elapsed_ms"] for result in request_results if result.get("elapsed_ms") is not None]
+    return {
+        "total": total,
+        "passed": passed,
+        "failed": total - passed,
+        "pass_rate": round(passed / total, 4) if total else 0.0,
+        "status_codes": dict(Counter(str(result.get("status_code")) for result in request_results)),
+        "contract_violations": sum(1 for result in request_results if result.get("validation_errors")),
+        "transport_errors": sum(1 for result in request_results if result.get("error")),
+        "avg_latency_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "max_latency_ms": max(latencies) if latencies else None,
+        "failed_operations": [
+            result.get("operation") or f"{result.get('method')} {result.get('endpoint')}"
+            for result in request_results
+            if not result.get("is_success")
+        ],
+    }
+
+
+def format_request_statistics(statistics: dict) -> str:
+    return "\n".join(f"- {key}: {value}" for key, value in statistics.items())
+
+
+def format_request_result(result: dict, max_body_chars: int = 500) -> str:
+    """One-line rendering of a result for summarization, with the body truncated to `max_body_chars`."""
+    body = result.get("body")
+    body = body if isinstance(body, str) else json.dumps(body, ensure_ascii=False)
+    if len(body) > max_body_chars:
+        body = body[:max_body_chars] + "... [truncated]"
+    fields = {
+        "operation": result.get("operation"),
+        "endpoint": f"{result.get('method')} {result.get('endpoint')}",
+        "is_success": result.get("is_success"),
+        "status_code": result.get("status_code"),
+        "error": result.get("error"),
+        "validation_errors": result.get("validation_errors") or None,
+        "body": body,
+    }
+    return json.dumps({key: value for key, value in fields.items() if value is not None}, ensure_ascii=False)
+
+
+def chunk_by_tokens(texts: list[str], max_tokens: int) -> list[list[str]]:
+    """Group texts in order so that every chunk stays within `max_tokens`, a longer text gets a chunk of its own."""
+    chunks, chunk, chunk_tokens = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if chunk and chunk_tokens + tokens > max_tokens:
+            chunks.append(chunk)
+            chunk, chunk_tokens = [], 0
+        chunk.append(text)
+        chunk_tokens += tokens
+    if chunk:
+        chunks.append(chunk)
+    return chunks
@@ -0,0 +1,152 @@
+import re
+from collections import defaultdict
+from typing import Any, Iterable
+
+PATH_PARAMETER_PATTERN = re.compile(r"^\{(.+)}$")
+
+# Producers of an ID are ranked so that a consumer only waits for the most reliable source of that ID.
+CREATE_PRODUCER = 0
+LIST_PRODUCER = 1
+SCHEMA_PRODUCER = 2
+
+
+def singularize(word: str) -> str:
+    word = word.lower()
+    if word.endswith("ies") and len(word) > 3:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def normalize_id_key(name: str, resource: str = None) -> str:
+    """Normalize an ID field name to a comparable key, e.g. `bannerId`, `banner_id` and `/banners/{id}` -> `bannerid`."""
+    key = re.sub(r"[^a-z0-9]", "", name.lower())
+    if key == "id" and resource:
+        return singularize(resource) + "id"
+    return key
+
+
+def is_id_field(name: str) -> bool:
+    return name == "id" or name.endswith("Id") or name.lower().endswith("_id")
+
+
+def split_endpoint_name(name: str) -> tuple[str, list[str]]:
+    method, route = name.split(" ", 1)
+    return method.upper(), [segment for segment in route.split("/") if segment]
+
+
+def iter_schema_properties(schema: Any, max_depth: int = 8) -> Iterable[str]:
+    """Yield every property name in a (dereferenced) JSON schema."""
+    if max_depth < 0:
+        return
+    if isinstance(schema, dict):
+        for name, value in (schema.get("properties") or {}).items():
+            yield name
+            yield from iter_schema_properties(value, max_depth - 1)
+        for key, value in schema.items():
+            if key != "properties" and isinstance(value, (dict, list)):
+                yield from iter_schema_properties(value, max_depth - 1)
+    elif isinstance(schema, list):
+        for value in schema:
+            yield from iter_schema_properties(value, max_depth - 1)
+
+
+def infer_consumed_ids(name: str, docs: dict) -> set[str]:
+    _, segments = split_endpoint_name(name)
+    consumed = set()
+    for position, segment in enumerate(segments):
+        matched = PATH_PARAMETER_PATTERN.match(segment)
+        if matched:
+            resource = segments[position - 1] if position > 0 else None
+            consumed.add(normalize_id_key(matched.group(1), resource))
+
+    for property_name in iter_schema_properties(docs.get("requestBody")):
+        if is_id_field(property_name) and property_name != "id":
+            consumed.add(normalize_id_key(property_name))
+    return consumed
+
+
+def infer_produced_ids(name: str, docs: dict, consumed_keys: set[str] = frozenset()) -> dict[str, int]:
+    """Return produced ID keys mapped to the producer rank (lower is preferred).
+
+    Response properties count as IDs when they look like one, or when another endpoint consumes them by that name
+    (e.g. `/user/{username}`).
+    """
+    method, segments = split_endpoint_name(name)
+    static_segments = [segment for segment in segments if not PATH_PARAMETER_PATTERN.match(segment)]
+    resource = static_segments[-1] if static_segments else None
+
+    produced = {}
+    for property_name in iter_schema_properties(docs.get("responses")):
+        key = normalize_id_key(property_name, resource)
+        if is_id_field(property_name) or key in consumed_keys:
+            produced[key] = SCHEMA_PRODUCER
+
+    if resource and segments and not PATH_PARAMETER_PATTERN.match(segments[-1]):
+        if method == "POST":
+            produced[normalize_id_key("id", resource)] = CREATE_PRODUCER
+        elif method == "GET":
+            produced[normalize_id_key("id", resource)] = LIST_PRODUCER
+    return produced
+
+
+def build_endpoint_dependencies(endpoints: list[tuple[str, str, dict]]) -> dict[int, set[int]]:
+    """Infer producer -> consumer edges between `ReducedOpenAPISpec` endpoints.
+
+    Returns:
+        dict: endpoint index -> indexes of the endpoints it must run after.
+    """
+    consumed = [infer_consumed_ids(name, docs) for name, _, docs in endpoints]
+    consumed_keys = set().union(*consumed)
+    produced = [infer_produced_ids(name, docs, consumed_keys) for name, _, docs in endpoints]
+
+    producers = defaultdict(list)
+    for index, produced_ids in enumerate(produced):
+        for key, rank in produced_ids.items():
+            # An endpoint that needs an ID to be called cannot be the one that provides it.
+            if key not in consumed[index]:
+                producers[key].append((rank, index))
+
+    dependencies = {index: set() for index in range(len(endpoints))}
+    for index, consumed_ids in enumerate(consumed):
+        for key in consumed_ids:
+            if not producers[key]:
+                continue
+            best_rank = min(rank for rank, _ in producers[key])
+            dependencies[index].update(producer for rank, producer in producers[key] if rank == best_rank)
+
+    # A DELETE invalidates the ID, so every other consumer of that ID runs before it.
+    for index, (name, _, _) in enumerate(endpoints):
+        if split_endpoint_name(name)[0] != "DELETE":
+            continue
+        for other, consumed_ids in enumerate(consumed):
+            if other != index and consumed_ids & consumed[index] and index not in dependencies[other]:
+                dependencies[index].add(other)
+
+    for index in dependencies:
+        dependencies[index].discard(index)
+    return dependencies
+
+
+def schedule_endpoint_levels(endpoints: list[tuple[str, str, dict]]) -> list[list[int]]:
+    """Group endpoint indexes into topological levels, every level can run in parallel.
+
+    Cycles are broken by releasing the earliest endpoint in spec order, so every endpoint is scheduled exactly once.
+    """
+    dependencies = build_endpoint_dependencies(endpoints)
+    remaining = {index: set(depends_on) for index, depends_on in dependencies.items()}
+
+    levels = []
+    while remaining:
+        level = sorted(index for index, depends_on in remaining.items() if not depends_on)
+        if not level:
+            level = [min(remaining)]
+        for index in level:
+            del remaining[index]
+        for depends_on in remaining.values():
+            depends_on.difference_update(level)
+        levels.append(level)
+    return levels
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+import requests
+
+from agent.shared.instrumentation import get_recorder, payload_size
+from agent.shared.sqlite_cache import SQLiteCacheStore
+
+TAVILY_BASE_URL = "https://api.tavily.com"
+DEFAULT_SEARCH_CACHE_PATH = os.environ.get("SEARCH_CACHE_PATH", ".search_cache.sqlite3")
+DEFAULT_SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 24 * 60 * 60))
+DEFAULT_SEARCH_CACHE_MAX_BYTES = int(os.environ.get("SEARCH_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+
+
+class SearchBackend(ABC):
+    """A web search API. Responses use Tavily's shape: `{"results": [{"title", "url", "content", "raw_content"}]}`."""
+
+    name: str
+
+    @abstractmethod
+    def search(self, query: str, max_results: int, include_raw_content: bool, **params: Any) -> dict:
+        pass
+
+
+class TavilySearchBackend(SearchBackend):
+    """Tavily's search endpoint over one `requests.Session`, created on first use, so searches reuse its connections.
+
+    The pinned tavily-python's `TavilyClient` sends each request with `requests.post`, which opens a new connection
+    every time, so the backend posts to the API itself.
+    """
+
+    name = "tavily"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: str = TAVILY_BASE_URL, timeout: float = 60):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    api_key = self.api_key or os.getenv("TAVILY_API_KEY")
+                    if not api_key:
+                        raise ValueError("TAVILY_API_KEY environment variable is not set")
+                    session = requests.Session()
+                    session.headers.update({"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"})
+                    self._session = session
+        return self._session
+
+    def search(self, query: str, max_results: int, include_raw_content: bool, **params: Any) -> dict:
+        response = self.session.post(
+            f"{self.base_url}/search",
+            json={"query": query, "max_results": max_results, "include_raw_content": include_raw_content, **params},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+def normalize_query(query: str) -> str:
+    """Case, surrounding punctuation and whitespace don't change what a search engine returns."""
+    return re.sub(r"\s+", " ", query).strip().strip("?!.,;:'\"").strip().casefold()
+
+
+class SearchResultCache:
+    """Search responses in a `SQLiteCacheStore`, keyed by backend, normalized query and search params.
+
+    Args:
+        namespace: Usually the agent name.
+        path: SQLite file shared by every namespace.
+        ttl: Seconds a response is served, None keeps responses until evicted by size.
+        max_bytes: Stored response bytes per namespace.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: str = DEFAULT_SEARCH_CACHE_PATH,
+        ttl: Optional[float] = DEFAULT_SEARCH_CACHE_TTL,
+        max_bytes: int = DEFAULT_SEARCH_CACHE_MAX_BYTES,
+    ):
+        self.namespace = namespace
+        self.path = path
+        self.store = SQLiteCacheStore("search_results", namespace, path, ttl, max_bytes)
+
+    def __repr__(self) -> str:
+        return f"SearchResultCache(namespace={self.namespace!r}, path={self.path!r})"
+
+    @property
+    def hits(self) -> int:
+        return self.store.hits
+
+    @property
+    def misses(self) -> int:
+        return self.store.misses
+
+    @staticmethod
+    def key(backend: str, query: str, params: dict) -> str:
+        return hashlib.sha256(
+            json.dumps([backend, normalize_query(query), params], sort_keys=True, default=repr).encode()
+        ).hexdigest()
+
+    def lookup(self, backend: str, query: str, params: dict) -> Optional[dict]:
+        response = self.store.get(self.key(backend, query, params))
+        return json.loads(response) if response else None
+
+    def update(self, backend: str, query: str, params: dict, response: dict):
+        self.store.put(self.key(backend, query, params), json.dumps(response, ensure_ascii=False, default=str))
+
+    def clear(self):
+        self.store.clear()
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+_backend: Optional[SearchBackend] = None
+_lock = threading.Lock()
+
+
+def get_search_backend() -> SearchBackend:
+    """The process-wide search backend, Tavily unless replaced with `set_search_backend`."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = TavilySearchBackend()
+    return _backend
+
+
+def set_search_backend(backend: Optional[SearchBackend]):
+    """Route every `search` to `backend`, e.g. a local stand-in in tests, None restores the Tavily default."""
+    global _backend
+    with _lock:
+        _backend = backend
+
+
+def search(
+    query: str,
+    max_results: int = 3,
+    include_raw_content: bool = False,
+    cache: Optional[SearchResultCache] = None,
+    backend: Optional[SearchBackend] = None,
+    **params: Any,
+) -> dict:
+    """Search with `backend` (the shared backend when None), serving repeated searches from `cache` when given."""
+    backend = backend or get_search_backend()
+    key_params = {"max_results": max_results, "include_raw_content": include_raw_content, **params}
+    if cache is not None:
+        response = cache.lookup(backend.name, query, key_params)
+        if response is not None:
+            return response
+
+    with get_recorder().span("search", backend.name, request_bytes=payload_size(query)) as span:
+        response = backend.search(query, max_results=max_results, include_raw_content=include_raw_content, **params)
+        span.response_bytes = payload_size(response)
+
+    if cache is not None:
+        cache.update(backend.name, query, key_params, response)
+    return response
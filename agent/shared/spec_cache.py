@@ -0,0 +1,75 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Optional
+
+import yaml
+from langchain_community.agent_toolkits.openapi.spec import ReducedOpenAPISpec
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Bump when the reduction output changes, so old pickles are not replayed.
+SPEC_CACHE_VERSION = 1
+
+
+def load_yaml(content: bytes) -> dict:
+    """Parse YAML with the libyaml loader when PyYAML was built with it."""
+    return yaml.load(content, Loader=SafeLoader)
+
+
+def spec_options_key(target_server_env: Optional[str], target_tags: Optional[list[str]], dereference: bool) -> str:
+    options = {
+        "version": SPEC_CACHE_VERSION,
+        "env": target_server_env,
+        "tags": sorted(tag.lower() for tag in target_tags or []),
+        "dereference": dereference,
+    }
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def spec_cache_path(cache_dir: str, filepath: str, options_key: str, content: bytes) -> str:
+    # Same-named specs in different directories must not share, and so prune, each other's entries
+    path_key = hashlib.sha256(os.path.abspath(filepath).encode()).hexdigest()[:8]
+    stem = f"{os.path.splitext(os.path.basename(filepath))[0]}-{path_key}"
+    content_key = hashlib.sha256(content).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{stem}.{options_key}.{content_key}.pickle")
+
+
+def load_cached_spec(cache_path: str) -> Optional[ReducedOpenAPISpec]:
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print("Failed to load cached spec cause by:", e)
+        return None
+
+
+def store_cached_spec(cache_path: str, spec: ReducedOpenAPISpec):
+    """Atomically write the compiled spec and drop entries built from older versions of the same file."""
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    stem, options_key, _, _ = os.path.basename(cache_path).rsplit(".", 3)
+    for stale_path in glob.glob(os.path.join(glob.escape(cache_dir), f"{glob.escape(stem)}.{options_key}.*.pickle")):
+        if stale_path != cache_path:
+            try:
+                os.remove(stale_path)
+            except FileNotFoundError:
+                pass  # Pruned by a concurrent process
+
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(spec, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
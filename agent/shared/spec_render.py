@@ -0,0 +1,94 @@
+import json
+from typing import Any
+
+DEFAULT_MAX_DEPTH = 4
+PREFERRED_CONTENT_TYPES = ("application/json", "application/x-www-form-urlencoded", "multipart/form-data")
+
+
+def render_schema(schema: Any, max_depth: int = DEFAULT_MAX_DEPTH, depth: int = 0) -> str:
+    """Render a (dereferenced) JSON schema as a TypeScript-like type, e.g. `{id?: integer; name: string}`.
+
+    Objects nested deeper than `max_depth` collapse to `object`. Descriptions are dropped, examples and enums are kept
+    because the planner needs them to build valid payloads.
+    """
+    if not isinstance(schema, dict) or not schema:
+        return "any"
+
+    for keyword, separator in (("oneOf", " | "), ("anyOf", " | ")):
+        if schema.get(keyword):
+            return separator.join(render_schema(option, max_depth, depth) for option in schema[keyword])
+    if schema.get("allOf"):
+        merged = {"type": "object", "properties": {}, "required": []}
+        for part in schema["allOf"]:
+            merged["properties"].update(part.get("properties") or {})
+            merged["required"].extend(part.get("required") or [])
+        return render_schema(merged, max_depth, depth)
+
+    if schema.get("enum"):
+        return " | ".join(json.dumps(value, ensure_ascii=False) for value in schema["enum"])
+
+    schema_type = schema.get("type")
+    # OpenAPI 3.1 lists the types of a union, e.g. ["string", "null"] for a nullable string
+    if isinstance(schema_type, list):
+        member = {key: value for key, value in schema.items() if key != "example"}
+        rendered = "|".join(
+            "null" if name == "null" else render_schema({**member, "type": name}, max_depth, depth)
+            for name in schema_type
+        )
+        rendered = rendered or "any"
+        if "example" in schema:
+            rendered += f" = {json.dumps(schema['example'], ensure_ascii=False)}"
+        return rendered
+
+    if schema_type == "array" or "items" in schema:
+        item_type = render_schema(schema.get("items"), max_depth, depth)
+        return f"({item_type})[]" if "|" in item_type else f"{item_type}[]"
+
+    if schema_type == "object" or "properties" in schema:
+        properties = schema.get("properties") or {}
+        if not properties:
+            return "object"
+        if depth >= max_depth:
+            return "object"
+        required = set(schema.get("required") or [])
+        fields = [
+            f"{name}{'' if name in required else '?'}: {render_schema(value, max_depth, depth + 1)}"
+            for name, value in properties.items()
+        ]
+        return "{" + "; ".join(fields) + "}"
+
+    rendered = schema_type or "any"
+    if schema.get("format") in ("date", "date-time", "uuid", "email", "uri", "binary"):
+        rendered += f"<{schema['format']}>"
+    if "example" in schema:
+        rendered += f" = {json.dumps(schema['example'], ensure_ascii=False)}"
+    return rendered
+
+
+def render_content(content: Any, max_depth: int) -> str:
+    if not isinstance(content, dict) or not content:
+        return "none"
+    content_type = next((name for name in PREFERRED_CONTENT_TYPES if name in content), next(iter(content)))
+    return f"({content_type}) {render_schema(content[content_type].get('schema'), max_depth)}"
+
+
+def render_endpoint(endpoint: tuple[str, str, dict], max_depth: int = DEFAULT_MAX_DEPTH) -> str:
+    """Render a `ReducedOpenAPISpec` endpoint as a compact signature for the planner prompt."""
+    name, description, docs = endpoint
+    lines = [name]
+    if description or docs.get("description"):
+        lines.append(description or docs.get("description"))
+
+    parameters = {}
+    for parameter in docs.get("parameters") or []:
+        required = "" if parameter.get("required") else "?"
+        rendered = f"{parameter['name']}{required}: {render_schema(parameter.get('schema'), max_depth)}"
+        parameters.setdefault(parameter.get("in", "query"), []).append(rendered)
+    for location, rendered in parameters.items():
+        lines.append(f"{location}: {'; '.join(rendered)}")
+
+    if docs.get("requestBody"):
+        lines.append(f"body: {render_content(docs['requestBody'].get('content'), max_depth)}")
+    if docs.get("responses"):
+        lines.append(f"response 200: {render_content(docs['responses'].get('content'), max_depth)}")
+    return "\n".join(lines)
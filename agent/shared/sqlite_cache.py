@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Optional
+
+
+class SQLiteCacheStore:
+    """Serialized values in one SQLite table, namespaced, with a TTL and least recently used eviction.
+
+    Each agent uses its own namespace, so its TTL, size bound and counters don't affect other agents sharing the file.
+
+    Args:
+        table: Table of the kind of values stored, e.g. LLM responses or search results.
+        namespace: Usually the agent name.
+        path: SQLite file shared by every namespace.
+        ttl: Seconds a value is served, None keeps values until evicted by size.
+        max_bytes: Stored value bytes per namespace, least recently used values are evicted beyond it.
+    """
+
+    def __init__(self, table: str, namespace: str, path: str, ttl: Optional[float], max_bytes: int):
+        self.table = table
+        self.namespace = namespace
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (namespace, accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _count(self, hit: bool):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+            if row and self.ttl is not None and row[1] + self.ttl < now:
+                conn.execute(f"DELETE FROM {self.table} WHERE namespace = ? AND key = ?", (self.namespace, key))
+                row = None
+            if row:
+                conn.execute(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key),
+                )
+        self._count(row is not None)
+        return row[0] if row else None
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, value, len(value.encode()), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        if self.ttl is not None:
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE namespace = ? AND created_at < ?", (self.namespace, now - self.ttl)
+            )
+        total_bytes = conn.execute(
+            f"SELECT COALESCE(SUM(size), 0) FROM {self.table} WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute(
+            f"SELECT key, size FROM {self.table} WHERE namespace = ? ORDER BY accessed_at", (self.namespace,)
+        ).fetchall():
+            if total_bytes <= self.max_bytes:
+                break
+            evicted.append((self.namespace, key))
+            total_bytes -= size
+        conn.executemany(f"DELETE FROM {self.table} WHERE namespace = ? AND key = ?", evicted)
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> dict:
+        with closing(self._connect()) as conn:
+            entries, size = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table} WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
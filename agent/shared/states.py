@@ -1,8 +1,10 @@
+import operator
 from dataclasses import dataclass, field
-from typing import TypedDict, List
+from typing import TypedDict, List, Annotated
 
 from langchain_community.agent_toolkits.openapi.spec import ReducedOpenAPISpec
 
+from agent.shared.id_index import merge_id_index
 from agent.shared.response_formats import APIPlanResponse
 
 
@@ -14,6 +16,11 @@ class DeepResearchState(TypedDict):
     web_search_responses: list
     keep_searching: bool
     summary: str
+    reasoning_stats: Annotated[list, operator.add]
+    source_signatures: Annotated[list, operator.add]  # Canonical URL and MinHash signature of every summarized source
+    skipped_sources: Annotated[int, operator.add]  # Near-duplicate sources dropped
+    skipped_tokens: Annotated[int, operator.add]  # Prompt tokens the dropped sources would have taken
+    information_gains: Annotated[list, operator.add]  # Share of new content in each summary update
 
 
 @dataclass(kw_only=True)
@@ -22,6 +29,19 @@ class APITestState:
     open_api_spec: ReducedOpenAPISpec = field(default=None)
     endpoint_size: int = field(default=0)
     endpoint_index: int = field(default=0)
-    request_plans: List[APIPlanResponse] = field(default=None)
-    request_results: List[dict] = field(default=None)
+    # Append-only channels: nodes return only the new items and the reducer appends them.
+    request_plans: Annotated[List[APIPlanResponse], operator.add] = field(default_factory=list)
+    request_results: Annotated[List[dict], operator.add] = field(default_factory=list)
+    id_index: Annotated[dict, merge_id_index] = field(default_factory=dict)  # ID key -> recent IDs from responses
     summary: str = field(default=None)
+    fan_out: bool = field(default=False)  # Plan and request each endpoint level concurrently via Send
+    endpoint_levels: List[List[int]] = field(default_factory=list)  # Topological levels of endpoint indexes
+    level_index: int = field(default=0)
+
+
+@dataclass(kw_only=True)
+class APIEndpointState:
+    token: str = field(default=None)
+    server: str = field(default=None)
+    endpoint: tuple = field(default=None)  # (name, description, docs) from ReducedOpenAPISpec.endpoints
+    candidate_ids: dict = field(default_factory=dict)
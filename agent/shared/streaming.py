@@ -0,0 +1,96 @@
+import json
+from dataclasses import dataclass, asdict
+from typing import Any, Iterable, Iterator, Literal, Optional
+
+from langchain_core.callbacks import BaseCallbackManager
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph.state import CompiledStateGraph
+
+from agent.shared.instrumentation import Recorder
+from agent.shared.reasoning import ThinkFilter
+
+
+@dataclass(kw_only=True, frozen=True)
+class StreamEvent:
+    """One event of `stream_graph`.
+
+    `token` events carry a piece of LLM output text of `node` as soon as the model produces it, with `<think>`
+    blocks dropped. `update` events carry the state update a node returned once it finished.
+    """
+
+    type: Literal["token", "update"]
+    node: str
+    data: Any
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False, default=str)
+
+
+def message_text(message: AIMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(part.get("text", "") for part in message.content if isinstance(part, dict))
+
+
+def stream_graph(
+    graph: CompiledStateGraph,
+    input: Any,
+    config: Optional[RunnableConfig] = None,
+    token_nodes: Optional[Iterable[str]] = None,
+    recorder: Optional[Recorder] = None,
+) -> Iterator[StreamEvent]:
+    """Stream LLM tokens and node updates of a graph run, using LangGraph's `messages` and `updates` modes together.
+
+    Args:
+        graph: Compiled graph.
+        input: Graph input.
+        config: Run config, e.g. `max_concurrency` or `configurable`.
+        token_nodes: Nodes whose LLM tokens are streamed, every node when None. Structured-output and internal
+            calls are usually left out, LLM calls tagged `nostream` never stream.
+        recorder: Records the run, its nodes and LLM calls when given.
+    """
+    if recorder:
+        callbacks = (config or {}).get("callbacks")
+        if isinstance(callbacks, BaseCallbackManager):
+            callbacks = callbacks.copy()
+            callbacks.add_handler(recorder.callback_handler())
+        else:
+            callbacks = [*(callbacks or []), recorder.callback_handler()]
+        config = {**(config or {}), "callbacks": callbacks}
+        with recorder.span("graph", graph.get_name()):
+            yield from _stream(graph, input, config, token_nodes)
+    else:
+        yield from _stream(graph, input, config, token_nodes)
+
+
+def _stream(
+    graph: CompiledStateGraph,
+    input: Any,
+    config: Optional[RunnableConfig],
+    token_nodes: Optional[Iterable[str]],
+) -> Iterator[StreamEvent]:
+    token_nodes = set(token_nodes) if token_nodes is not None else None
+    think_filters: dict[str, ThinkFilter] = {}
+    for mode, chunk in graph.stream(input, config, stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            message, metadata = chunk
+            node = metadata.get("langgraph_node")
+            if token_nodes is not None and node not in token_nodes:
+                continue
+            # Cache hits and non-streaming models arrive as one whole AIMessage instead of chunks
+            if not isinstance(message, (AIMessageChunk, AIMessage)):
+                continue
+            think_filter = think_filters.setdefault(message.id, ThinkFilter())
+            if text := think_filter.feed(message_text(message)):
+                yield StreamEvent(type="token", node=node, data=text)
+        else:
+            for node, update in chunk.items():
+                yield StreamEvent(type="update", node=node, data=update)
+
+
+def print_stream_event(event: StreamEvent):
+    if event.type == "token":
+        print(event.data, end="", flush=True)
+    else:
+        print(f"\n{event.node} {event.data}", flush=True)
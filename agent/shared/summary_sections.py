@@ -0,0 +1,87 @@
+import re
+
+from agent.shared.tokens import TokenCounter
+
+# Section of text without any heading, small models don't always keep to the format
+DEFAULT_SECTION_TITLE = "Overview"
+# Only level-3 headings start a section, deeper headings the model writes inside one stay part of its content
+HEADING_PATTERN = re.compile(r"^[ \t]{0,3}###[ \t]+(.+?)[ \t]*#*[ \t]*$", re.MULTILINE)
+OMITTED_CONTENT = "(content omitted)"
+
+
+def parse_sections(text: str) -> dict[str, str]:
+    """Title -> content of the "### " sections of `text`, a title given twice keeps its last content.
+
+    Text before the first heading is dropped, it is the model's chatter around the sections it was asked for. Text
+    without any heading is a single `DEFAULT_SECTION_TITLE` section.
+    """
+    sections = {}
+    headings = list(HEADING_PATTERN.finditer(text or ""))
+    if not headings:
+        return {DEFAULT_SECTION_TITLE: text.strip()} if text and text.strip() else {}
+    for heading, following in zip(headings, [*headings[1:], None]):
+        content = text[heading.end() : following.start() if following else None].strip()
+        title = heading.group(1).strip("*_ :")
+        if title and content and content != OMITTED_CONTENT:
+            sections[title] = content
+    return sections
+
+
+def has_sections(text: str) -> bool:
+    return bool(HEADING_PATTERN.search(text or ""))
+
+
+def merge_sections(
+    sections: dict[str, str], delta: dict[str, str], append_to: set[str] = frozenset()
+) -> dict[str, str]:
+    """Apply new or updated sections in `delta` to `sections`, matching titles case-insensitively.
+
+    An updated section replaces the content the model was shown. Sections in `append_to` were not shown in full,
+    the update is added to their content instead, so what the model never saw isn't lost.
+    """
+    merged = dict(sections)
+    titles = {title.casefold(): title for title in merged}
+    appended = {title.casefold() for title in append_to}
+    for title, content in delta.items():
+        key = title.casefold()
+        if key not in titles:
+            titles[key] = title
+            merged[title] = content
+        elif key in appended:
+            merged[titles[key]] = f"{merged[titles[key]]}\n\n{content}"
+        else:
+            merged[titles[key]] = content
+    return merged
+
+
+def render_sections(sections: dict[str, str]) -> str:
+    return "\n\n".join(f"### {title}\n{content}" for title, content in sections.items())
+
+
+def fit_sections(sections: dict[str, str], counter: TokenCounter, max_tokens: int) -> tuple[str, set[str]]:
+    """Render the sections that fit into `max_tokens` in full and only the titles of the others.
+
+    A section cut off mid-way would read as complete, an update of it would drop the rest. Room for the title lines
+    of the later sections is kept before showing one in full, titles that don't fit either are left out.
+
+    Returns:
+        The rendered sections and the titles whose content was omitted.
+    """
+    blocks = [
+        (title, f"### {title}\n{content}", f"### {title}\n{OMITTED_CONTENT}") for title, content in sections.items()
+    ]
+    title_tokens = [counter.count(title_block) + 1 for _, _, title_block in blocks]
+    later_titles = sum(title_tokens)
+    rendered, omitted, used = [], set(), 0
+    for (title, block, title_block), tokens in zip(blocks, title_tokens):
+        later_titles -= tokens
+        block_tokens = counter.count(block) + 1
+        if used + block_tokens + later_titles <= max_tokens:
+            rendered.append(block)
+            used += block_tokens
+            continue
+        omitted.add(title)
+        if used + tokens <= max_tokens:
+            rendered.append(title_block)
+            used += tokens
+    return "\n\n".join(rendered), omitted
@@ -0,0 +1,140 @@
+import json
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from typing import Optional
+
+TOKEN_PIECE_PATTERN = re.compile(r"[A-Za-z]+|\d+|[가-힣]|[^\sA-Za-z\d가-힣]")
+
+# Hugging Face tokenizers of the Ollama model families we run, keyed by the model name before the tag
+TOKENIZER_REPOS = {
+    "qwen2.5": "Qwen/Qwen2.5-14B-Instruct",
+    "deepseek-r1": "deepseek-ai/DeepSeek-R1-Distill-Qwen-14B",
+    "exaone3.5": "LGAI-EXAONE/EXAONE-3.5-7.8B-Instruct",
+    "gemma3": "google/gemma-3-4b-it",
+}
+DEFAULT_TOKEN_CALIBRATION_PATH = os.environ.get("TOKEN_CALIBRATION_PATH", ".token_calibration.json")
+TOKENIZER_ALLOW_DOWNLOAD = os.environ.get("TOKENIZER_ALLOW_DOWNLOAD", "False").lower() in ("true", "1", "t")
+
+
+def token_features(text: str) -> tuple[int, int, int, int]:
+    """Latin, digit, Hangul and symbol costs of `text`: ~4 letters or ~3 digits per token, one per syllable or symbol."""
+    latin, digit, hangul, symbol = 0, 0, 0, 0
+    for piece in TOKEN_PIECE_PATTERN.findall(text):
+        if piece[0].isascii() and piece[0].isalpha():
+            latin += math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            digit += math.ceil(len(piece) / 3)
+        elif "가" <= piece[0] <= "힣":
+            hangul += 1
+        else:
+            symbol += 1
+    return latin, digit, hangul, symbol
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token estimate: ~4 letters or ~3 digits per token, one token per Hangul syllable or symbol."""
+    return sum(token_features(text))
+
+
+@dataclass(kw_only=True, frozen=True)
+class TokenWeights:
+    """Tokens per unit of each `token_features` cost, fitted per model by `agent.benchmarks.token_calibration`."""
+
+    latin: float = 1.0
+    digit: float = 1.0
+    hangul: float = 1.0
+    symbol: float = 1.0
+
+    def cost(self, features: tuple[int, int, int, int]) -> float:
+        return sum(weight * value for weight, value in zip(asdict(self).values(), features))
+
+
+def model_family(model: str) -> str:
+    return model.split(":", 1)[0].split("/")[-1].lower()
+
+
+def load_token_weights(model: str, path: str = DEFAULT_TOKEN_CALIBRATION_PATH) -> TokenWeights:
+    try:
+        with open(path, "r") as f:
+            calibration = json.load(f)
+    except (OSError, ValueError):
+        return TokenWeights()
+    return TokenWeights(**calibration.get(model_family(model), {}))
+
+
+def store_token_weights(model: str, weights: TokenWeights, path: str = DEFAULT_TOKEN_CALIBRATION_PATH):
+    try:
+        with open(path, "r") as f:
+            calibration = json.load(f)
+    except (OSError, ValueError):
+        calibration = {}
+    calibration[model_family(model)] = asdict(weights)
+    with open(path, "w") as f:
+        json.dump(calibration, f, indent=2, sort_keys=True)
+
+
+def load_tokenizer(model: str, allow_download: bool = TOKENIZER_ALLOW_DOWNLOAD):
+    """The Hugging Face tokenizer of an Ollama model, None when transformers or the tokenizer files are unavailable."""
+    repo = TOKENIZER_REPOS.get(model_family(model))
+    if repo is None:
+        return None
+    try:
+        from transformers import AutoTokenizer
+
+        return AutoTokenizer.from_pretrained(repo, local_files_only=not allow_download)
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+class TokenCounter:
+    """Counts and truncates text in tokens of `model`.
+
+    Uses the model's real tokenizer when it's available locally, otherwise `token_features` weighted with the
+    model's calibration, which is `estimate_tokens` until the model has been calibrated.
+    """
+
+    def __init__(self, model: str, tokenizer=None, weights: Optional[TokenWeights] = None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.weights = weights or load_token_weights(model)
+        self._lock = threading.Lock()
+
+    @property
+    def exact(self) -> bool:
+        return self.tokenizer is not None
+
+    def count(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            with self._lock:
+                return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return math.ceil(self.weights.cost(token_features(text)))
+
+    def truncate(self, text: Optional[str], max_tokens: int, marker: str = "... [truncated]") -> str:
+        """Longest prefix of `text` that fits `max_tokens` together with `marker`, `text` itself when it fits."""
+        if not text or max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        max_tokens = max(max_tokens - self.count(marker), 0)
+        if self.tokenizer is not None:
+            with self._lock:
+                token_ids = self.tokenizer.encode(text, add_special_tokens=False)
+                return self.tokenizer.decode(token_ids[:max_tokens]) + marker
+
+        cost = 0.0
+        for match in TOKEN_PIECE_PATTERN.finditer(text):
+            cost += self.weights.cost(token_features(match.group()))
+            if cost > max_tokens:
+                return text[: match.start()].rstrip() + marker
+        return text
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model: str) -> TokenCounter:
+    return TokenCounter(model, load_tokenizer(model))
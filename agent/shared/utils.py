@@ -1,13 +1,20 @@
+import hashlib
+import os
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable
 
-import requests
-import yaml
 from langchain_community.agent_toolkits.openapi.spec import ReducedOpenAPISpec
-from langchain_core.utils.json_schema import dereference_refs
 from langgraph.graph.state import CompiledStateGraph
 
+from agent.shared.api_client import APIRequestExecutor, get_default_executor
+from agent.shared.openapi_reducer import OpenAPIReducer
 from agent.shared.response_formats import APIPlanResponse
+from agent.shared.spec_cache import load_yaml, spec_options_key, spec_cache_path, load_cached_spec, store_cached_spec
+
+DEFAULT_SPEC_CACHE_DIR = os.environ.get("OPENAPI_SPEC_CACHE_DIR", ".spec_cache")
+# Parsed specs kept in memory, least recently used first
+MAX_OPENAPI_REDUCERS = 4
+_openapi_reducers: dict[str, OpenAPIReducer] = {}
 
 
 def draw_graph_png(filepath: str, graph: CompiledStateGraph):
@@ -27,82 +34,58 @@ def reduce_openapi_spec(
     target_server_env: str = None,
     target_tags: list[str] = None,
     dereference: bool = True,
+    cache_dir: Optional[str] = DEFAULT_SPEC_CACHE_DIR,
 ) -> ReducedOpenAPISpec:
-    with open(filepath, "r") as f:
-        json_api_spec = yaml.safe_load(f)
-    return _reduce_my_openapi_spec(json_api_spec, target_server_env, target_tags, dereference)
-
-
-def _reduce_my_openapi_spec(
-    spec: dict,
-    target_server_env: str = None,
-    target_tags: list[str] = None,
-    dereference: bool = True,
-) -> ReducedOpenAPISpec:
-    target_server_env = target_server_env or "dev"
-    target_tags = set(tag.lower() for tag in target_tags) or set()
-    target_methods = ["get", "post", "patch", "put", "delete"]
-
-    endpoints = []
-    for route, operation in spec["paths"].items():
-        for operation_name, docs in operation.items():
-            ok_method = operation_name.lower() in target_methods
-            ok_tag = set(tag.lower() for tag in docs.get("tags")).intersection(target_tags) != set()
-
-            if ok_method and ok_tag:
-                endpoints.append((f"{operation_name.upper()} {route}", docs.get("description"), docs))
-
-    if dereference:
-        endpoints = [
-            (name, description, dereference_refs(docs, full_schema=spec)) for name, description, docs in endpoints
-        ]
-
-    def reduce_endpoint_docs(docs: dict) -> dict:
-        out = {}
-        if docs.get("description"):
-            out["description"] = docs.get("description")
-        if docs.get("parameters"):
-            out["parameters"] = [parameter for parameter in docs.get("parameters", []) if parameter.get("required")]
-        if "200" in docs["responses"]:
-            out["responses"] = docs["responses"]["200"]
-        if docs.get("requestBody"):
-            out["requestBody"] = docs.get("requestBody")
-        return out
-
-    def filter_servers(servers: list[dict]) -> list[dict]:
-        servers = [server for server in servers if target_server_env in server["url"]]
-        if not servers:
-            raise ValueError(f"Server {target_server_env} not found in {spec['servers']}")
-        return servers
-
-    endpoints = [(name, description, reduce_endpoint_docs(docs)) for name, description, docs in endpoints]
-    return ReducedOpenAPISpec(
-        servers=filter_servers(spec["servers"]),
-        description="",
-        endpoints=endpoints,
-    )
-
-
-def request_api_by_plan(server: str, plan: APIPlanResponse, token: Optional[str]) -> Dict[str, Any]:
-    try:
-        url = server + plan.endpoint
-        response = requests.request(
-            method=plan.method,
-            url=url,
-            params=plan.query_params,
-            json=plan.payload,
-            headers={"Authorization": f"Bearer {token}"} if token else {},
-        )
-        return {
-            "endpoint": plan.endpoint,
-            "is_success": response.ok,
-            "status_code": response.status_code,
-            "body": response.json() if response.headers.get("Content-Type") == "application/json" else response.text,
-        }
-    except Exception as e:
-        return {
-            "error": str(e),
-        }
+    """Load and reduce an OpenAPI spec file.
+
+    The reduced spec is cached under `cache_dir` keyed by the file content hash, env, tags and dereference flag,
+    so it is only rebuilt when the file changes. Pass `cache_dir=None` to always rebuild.
+    """
+    with open(filepath, "rb") as f:
+        content = f.read()
+
+    cache_path = None
+    if cache_dir:
+        options_key = spec_options_key(target_server_env, target_tags, dereference)
+        cache_path = spec_cache_path(cache_dir, filepath, options_key, content)
+        cached_spec = load_cached_spec(cache_path)
+        if cached_spec is not None:
+            return cached_spec
+
+    reduced_spec = _get_openapi_reducer(content).reduce(target_server_env, target_tags, dereference)
+    if cache_path:
+        store_cached_spec(cache_path, reduced_spec)
+    return reduced_spec
+
+
+def _get_openapi_reducer(content: bytes) -> OpenAPIReducer:
+    """Reducer of a spec file's content, reused across env and tag selections for its tag index and resolved $refs."""
+    content_key = hashlib.sha256(content).hexdigest()
+    reducer = _openapi_reducers.pop(content_key, None) or OpenAPIReducer(load_yaml(content))
+    _openapi_reducers[content_key] = reducer
+    while len(_openapi_reducers) > MAX_OPENAPI_REDUCERS:
+        del _openapi_reducers[next(iter(_openapi_reducers))]
+    return reducer
+
+
+def request_api_by_plan(
+    server: str,
+    plan: APIPlanResponse,
+    token: Optional[str],
+    executor: Optional[APIRequestExecutor] = None,
+    validator: Optional[Callable[[Any, int], list[str]]] = None,
+) -> Dict[str, Any]:
+    return (executor or get_default_executor()).request(server, plan, token, validator)
+
+
+async def arequest_api_by_plan(
+    server: str,
+    plan: APIPlanResponse,
+    token: Optional[str],
+    executor: Optional[APIRequestExecutor] = None,
+    validator: Optional[Callable[[Any, int], list[str]]] = None,
+) -> Dict[str, Any]:
+    return await (executor or get_default_executor()).arequest(server, plan, token, validator)
 
 
 def escape_with_double_curly_braces(element: Any) -> str:
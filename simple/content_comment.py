@@ -1,6 +1,7 @@
-from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama
+
+from agent.shared.llm import get_chat_ollama
+from agent.shared.llm_cache import LLMResponseCache, stream_with_cache
 
 system_prompt = """
 당신은 '핏펫 커뮤니티'의 공식 AI 어시스턴트, '멍집사'입니다. 당신의 주요 임무는 반려동물과 함께하는 사용자들이 서로 돕고 유용한 정보를 나눌 수 있도록 지원하는 것입니다. 당신은 따뜻한 마음과 전문성을 겸비하여 사용자들의 게시글에 깊이 공감하고, 그들의 궁금증을 해소하며, 필요시 핏펫의 유용한 서비스(특히 병원 예약)를 안내하여 실질적인 도움을 제공합니다. 
@@ -35,14 +36,15 @@ system_prompt = """
 """.strip()
 
 
-llm = ChatOllama(model="gemma3:4b", temparature=0.3)
+# Re-commenting the same post is served from disk, set to None to always call the model
+llm_cache = LLMResponseCache("content_comment")
+llm = get_chat_ollama("gemma3:4b", temperature=0.3, cache=llm_cache)
 prompt = ChatPromptTemplate.from_messages(
     [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": "글: {user_input}"},
     ]
 )
-chain = prompt | llm | StrOutputParser()
 user_input = "종합접종 맞출때가 되었는데 대부분 가격이 어떻게 되나요? 1년에 한번씩 마쭈는데 병원마다어디는 4번 어디는 6차까지 맞춰야 한다그러고, 순서도 다르고 비용도 달라서 평균적으로 다른 분들은 어떻게 맞추시는지요"
 
 # chat_response = chain.invoke(
@@ -51,5 +53,7 @@ user_input = "종합접종 맞출때가 되었는데 대부분 가격이 어떻
 #     }
 # )
 # print(chat_response)
-for token in chain.stream({"user_input": user_input}):
-    print(token, end="", flush=True)
+for token in stream_with_cache(llm, prompt.invoke({"user_input": user_input})):
+    print(token.content, end="", flush=True)
+if llm_cache:
+    print("\nllm cache", llm_cache.stats())
@@ -3,6 +3,8 @@ from langchain_community.document_loaders import WebBaseLoader
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from agent.shared.llm_cache import LLMResponseCache, stream_with_cache
+
 loader = WebBaseLoader(
     web_path="https://www.lesswrong.com/posts/tqmQTezvXGFmfSe7f/how-much-are-llms-actually-boosting-real-world-programmer",
 )
@@ -61,10 +63,17 @@ prompt = ChatPromptTemplate.from_messages(
 )
 
 load_dotenv()
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-lite", temperature=0.1)
+# Re-summarizing the same page is served from disk, set to None to always call the model
+llm_cache = LLMResponseCache("summary_web")
+llm = ChatGoogleGenerativeAI(
+    model="gemini-2.0-flash-lite",
+    temperature=0.1,
+    cache=llm_cache.bind(model="gemini-2.0-flash-lite", temperature=0.1) if llm_cache else None,
+)
 # llm = ChatOllama(model="exaone3.5:7.8b-instruct-fp16", temperature=0.1)
 
-chain = prompt | llm
-events = chain.stream({"text": format_documents(docs)})
+events = stream_with_cache(llm, prompt.invoke({"text": format_documents(docs)}))
 for token in events:
     print(token.content, end="", flush=True)
+if llm_cache:
+    print("\nllm cache", llm_cache.stats())